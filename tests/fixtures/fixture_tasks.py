@@ -0,0 +1,6 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def eager_tasks(settings):
+    settings.TASKS_EAGER = True
@@ -0,0 +1,140 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Гоняет смесь параллельных чтений главной и публикаций постов '
+        'на SQLite без прагм и с SQLITE_PRAGMAS. Печатает JSON с '
+        'пропускной способностью, задержками и числом ошибок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Сколько запросов делает каждый поток.',
+        )
+        parser.add_argument(
+            '--output', help='Файл для JSON вместо стандартного вывода.'
+        )
+
+    def handle(self, *args, **options):
+        threads = options['readers'] + options['writers']
+        if options['requests'] < 1 or threads < 1:
+            raise CommandError('Нужен хотя бы один поток и один запрос.')
+        report = {
+            'config': {
+                key: options[key]
+                for key in ('posts', 'readers', 'writers', 'requests')
+            },
+        }
+        # Ошибки блокировки считаются в отчёте, а не пишутся в лог.
+        request_logger = logging.getLogger('django.request')
+        request_logger.disabled = True
+        try:
+            self.run_both(report, options)
+        finally:
+            request_logger.disabled = False
+        benchmark.write_report(self.stdout, report, options['output'])
+
+    def run_both(self, report, options):
+        for label, pragmas in (
+            ('default', {}),
+            ('tuned', settings.SQLITE_PRAGMAS),
+        ):
+            # Все публикации идут от одного автора: с лимитом частоты
+            # замер сравнивал бы ответы 429, а не запись в базу. Кеш
+            # чистится, чтобы прогоны не делили счётчики и ленты.
+            cache.clear()
+            with override_settings(SQLITE_PRAGMAS=pragmas, RATELIMITS={}):
+                with benchmark.benchmark_database():
+                    report[label] = {
+                        'pragmas': pragmas,
+                        **self.run_mix(options),
+                    }
+            self.check_writes(label, report[label]['write'])
+
+    def check_writes(self, label, write):
+        """Предупреждает, если не все публикации дошли до редиректа."""
+        failed = {
+            status: total
+            for status, total in write.get('statuses', {}).items()
+            if status != '302'
+        }
+        if failed:
+            self.stderr.write(self.style.WARNING(
+                f'{label}: часть публикаций не записана, ответы {failed}.'
+            ))
+
+    def worker(self, author, method, address, text, count):
+        client = benchmark.make_client(author)
+        send = getattr(client, method)
+        samples = []
+        errors = 0
+        try:
+            for number in range(count):
+                data = None if text is None else {'text': f'{text} {number}'}
+                started = time.perf_counter()
+                try:
+                    response = send(address, data)
+                except OperationalError:
+                    # «database is locked»: запрос не дождался записи.
+                    errors += 1
+                    continue
+                elapsed = time.perf_counter() - started
+                samples.append((elapsed, 0, response.status_code))
+        finally:
+            connections.close_all()
+        return samples, errors
+
+    def run_mix(self, options):
+        author = benchmark.seed(
+            users=50, groups=5, posts=options['posts']
+        )
+        jobs = [
+            ('read', 'get', reverse('posts:index'), None)
+        ] * options['readers'] + [
+            ('write', 'post', reverse('posts:post_create'), 'Новый пост')
+        ] * options['writers']
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = [
+                (kind, executor.submit(
+                    self.worker, author, method, address, text,
+                    options['requests'],
+                ))
+                for kind, method, address, text in jobs
+            ]
+            results = {'read': ([], 0), 'write': ([], 0)}
+            for kind, future in futures:
+                samples, errors = future.result()
+                total_samples, total_errors = results[kind]
+                results[kind] = (
+                    total_samples + samples, total_errors + errors
+                )
+        elapsed = time.perf_counter() - started
+        report = {}
+        for kind, (samples, errors) in results.items():
+            if not samples:
+                report[kind] = {'errors': errors}
+                continue
+            summary = benchmark.summarize(samples, elapsed)
+            del summary['queries_per_request']
+            report[kind] = {**summary, 'errors': errors}
+        report['elapsed_s'] = round(elapsed, 3)
+        return report
@@ -0,0 +1,111 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.warmup import reset_templates, warm_templates
+from posts import benchmark
+
+
+def cached_templates_settings():
+    """TEMPLATES с кеширующим загрузчиком, как вне режима отладки."""
+    templates = []
+    for config in settings.TEMPLATES:
+        options = dict(config.get('OPTIONS', {}))
+        loaders = options.get('loaders')
+        if loaders is None:
+            loaders = ['django.template.loaders.filesystem.Loader']
+            if config.get('APP_DIRS'):
+                loaders.append(
+                    'django.template.loaders.app_directories.Loader'
+                )
+        if not is_cached(loaders):
+            options['loaders'] = [
+                ('django.template.loaders.cached.Loader', loaders),
+            ]
+        templates.append({**config, 'APP_DIRS': False, 'OPTIONS': options})
+    return templates
+
+
+def is_cached(loaders):
+    return any(
+        isinstance(loader, tuple)
+        and loader[0] == 'django.template.loaders.cached.Loader'
+        for loader in loaders
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время первого запроса к каждому адресу posts и users '
+        'после перезапуска процесса без прогрева шаблонов и с ним. '
+        'Печатает JSON с медианами по раундам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=5,
+            help='Сколько раз повторить холодный и прогретый замер.',
+        )
+        parser.add_argument(
+            '--output', help='Файл для JSON вместо стандартного вывода.'
+        )
+
+    def handle(self, *args, **options):
+        if options['rounds'] < 1:
+            raise CommandError('--rounds должен быть положительным.')
+        with benchmark.benchmark_database(), override_settings(
+            TEMPLATES=cached_templates_settings()
+        ):
+            report = self.run_benchmark(options)
+        benchmark.write_report(self.stdout, report, options['output'])
+
+    def first_request(self, author, address):
+        cache.clear()
+        (elapsed, _, _), = benchmark.timed_requests(
+            author, 'get', address, 1, 'default'
+        )
+        return elapsed * 1000
+
+    def run_benchmark(self, options):
+        author = benchmark.seed(users=20, groups=5, posts=options['posts'])
+        routes = [
+            (name, address)
+            for name, method, address in benchmark.build_routes(author)
+            if method == 'get'
+        ]
+        cold = {name: [] for name, _ in routes}
+        warm = {name: [] for name, _ in routes}
+        warmup = []
+        for _ in range(options['rounds']):
+            for name, address in routes:
+                reset_templates()
+                cold[name].append(self.first_request(author, address))
+            reset_templates()
+            started = time.perf_counter()
+            compiled = warm_templates()
+            warmup.append((time.perf_counter() - started) * 1000)
+            for name, address in routes:
+                warm[name].append(self.first_request(author, address))
+        return {
+            'config': {'posts': options['posts'], 'rounds': options['rounds']},
+            'warmup': {
+                'templates': compiled,
+                'ms': round(statistics.median(warmup), 3),
+            },
+            'results': [
+                {
+                    'route': name,
+                    'path': address,
+                    'cold_ms': round(statistics.median(cold[name]), 3),
+                    'warm_ms': round(statistics.median(warm[name]), 3),
+                }
+                for name, address in routes
+            ],
+        }
@@ -0,0 +1,33 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite-базу в файлы реплик из '
+        'DATABASE_REPLICAS. Копия снимается через backup API и не '
+        'останавливает запись в основную базу.'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('В DATABASE_REPLICAS нет реплик.')
+        source_settings = connections[DEFAULT_DB_ALIAS].settings_dict
+        for alias in settings.DATABASE_REPLICAS:
+            for name in (DEFAULT_DB_ALIAS, alias):
+                if connections[name].vendor != 'sqlite':
+                    raise CommandError(f'База {name} не SQLite.')
+            # Открытое соединение реплики держало бы старую копию.
+            connections[alias].close()
+            source = sqlite3.connect(source_settings['NAME'])
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            self.stdout.write(f'{alias}: скопирована.')
+        self.stdout.write(self.style.SUCCESS('Реплики обновлены.'))
@@ -0,0 +1,173 @@
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template
+
+from .replicas import STICKY_COOKIE, use_replicas
+
+logger = logging.getLogger('core.profiling')
+
+_local = threading.local()
+
+
+def _profile():
+    return getattr(_local, 'profile', None)
+
+
+def _install_template_timer():
+    """Оборачивает рендер шаблонов Django, чтобы засекать его время.
+
+    Считается только рендер верхнего уровня: вложенные ``include`` и
+    ``extends`` уже входят в его время.
+    """
+    if getattr(Template.render, 'profiled', False):
+        return
+    render = Template.render
+
+    @wraps(render)
+    def timed_render(self, *args, **kwargs):
+        profile = _profile()
+        if profile is None or profile.rendering:
+            return render(self, *args, **kwargs)
+        profile.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_time += time.perf_counter() - started
+            profile.rendering = False
+
+    timed_render.profiled = True
+    Template.render = timed_render
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.view_time = 0.0
+        self.view_started = None
+        self.rendering = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.queries += 1
+
+
+class ProfilingMiddleware:
+    """Замеряет SQL, рендер шаблонов и представление для доли запросов.
+
+    Долю задаёт ``settings.PROFILING_SAMPLE_RATE`` от 0 до 1; при 0
+    middleware отключается при запуске. Замеры уходят в заголовок
+    ``Server-Timing`` и строкой JSON в логгер ``core.profiling``.
+    Ставить первым в ``MIDDLEWARE``, чтобы ``total`` включал остальные
+    middleware.
+    """
+
+    def __init__(self, get_response):
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _install_template_timer()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        profile = RequestProfile()
+        _local.profile = profile
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+                if profile.view_started is not None:
+                    profile.view_time = (
+                        time.perf_counter() - profile.view_started
+                    )
+        finally:
+            _local.profile = None
+        total = time.perf_counter() - started
+        self.report(request, response, profile, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = _profile()
+        if profile is not None:
+            profile.view_started = time.perf_counter()
+
+    def report(self, request, response, profile, total):
+        timings = {
+            'sql': profile.sql_time,
+            'tpl': profile.template_time,
+            'view': profile.view_time,
+            'total': total,
+        }
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.1f}'
+            + (f';desc="{profile.queries} queries"' if name == 'sql' else '')
+            for name, duration in timings.items()
+        )
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': profile.queries,
+            **{
+                f'{name}_ms': round(duration * 1000, 2)
+                for name, duration in timings.items()
+            },
+        }))
+
+
+class ReplicaMiddleware:
+    """Отправляет чтения помеченных представлений на реплики.
+
+    См. ``core.replicas``. Ставить последним в ``MIDDLEWARE``, чтобы
+    чтение с реплик охватывало только само представление. Без реплик в
+    ``settings.DATABASE_REPLICAS`` отключается при запуске.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replicas(False)
+        if (
+            request.method == 'POST'
+            and response.status_code < HTTPStatus.BAD_REQUEST
+        ):
+            response.set_cookie(
+                STICKY_COOKIE,
+                '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        use_replicas(
+            request.method in ('GET', 'HEAD')
+            and getattr(view_func, 'read_replica', False)
+            and STICKY_COOKIE not in request.COOKIES
+        )
@@ -0,0 +1,152 @@
+"""Ограничение частоты запросов на счётчиках в кеше Django.
+
+Лимиты задаются в ``settings.RATELIMITS`` строками вида ``'10/m'``
+(запросов в секунду, минуту, час или сутки) под именем, которое
+представление передаёт декоратору ``ratelimit``. Запросы считаются
+для пользователя, а у анонимного посетителя — для его IP-адреса (см.
+``client_ip``).
+
+Окно скользящее: число запросов за последний период оценивается как
+счётчик текущего окна плюс счётчик предыдущего с весом, равным доле
+периода, которую предыдущее окно ещё перекрывает. Оба числа лежат в
+одном ключе текущего окна: счётчик предыдущего окна — в старших
+разрядах (``WINDOW_SHIFT``), куда его кладёт первый запрос окна.
+Поэтому проверка — это один ``cache.incr``, по результату которого
+одновременные запросы не проскакивают за лимит. Первый запрос окна
+обходится в три обращения (``incr``, ``get`` прошлого окна и ``add``),
+отказ — в два: прибавленная единица снимается ``cache.decr``.
+
+Счётчики должны лежать в общем для всех процессов кеше (memcached,
+Redis): с ``LocMemCache`` каждый процесс считает сам по себе, и при N
+процессах лимит фактически в N раз больше.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Множитель счётчика предыдущего окна в значении ключа текущего.
+WINDOW_SHIFT = 2 ** 32
+TOO_MANY_REQUESTS = 429
+
+
+def parse_rate(rate):
+    """Превращает ``'10/m'`` в ``(10, 60)``."""
+    try:
+        count, period = rate.split('/')
+        return int(count), PERIODS[period]
+    except (KeyError, ValueError):
+        raise ImproperlyConfigured(f'Неверный лимит {rate!r}.')
+
+
+def client_ip(request):
+    """IP-адрес посетителя с учётом доверенных прокси.
+
+    За ``settings.RATELIMIT_TRUSTED_PROXIES`` прокси, каждый из которых
+    дописывает адрес клиента в ``X-Forwarded-For``, адрес посетителя —
+    столько-то с конца в этом заголовке. Без прокси берётся
+    ``REMOTE_ADDR``: иначе заголовок подделывается самим клиентом.
+    """
+    proxies = settings.RATELIMIT_TRUSTED_PROXIES
+    if proxies:
+        forwarded = [
+            address.strip()
+            for address in request.META.get(
+                'HTTP_X_FORWARDED_FOR', ''
+            ).split(',')
+            if address.strip()
+        ]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def client_key(request):
+    """Кого считать: пользователя или IP-адрес анонимного посетителя."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+def hit(key, previous_key, timeout):
+    """Засчитывает запрос в окне ``key`` и возвращает значение ключа.
+
+    Обычно это один ``incr``. Первый запрос окна создаёт ключ через
+    ``add``, перенося в старшие разряды счётчик окна ``previous_key``,
+    а если другой процесс успел раньше, снова делает ``incr``.
+    """
+    try:
+        return cache.incr(key)
+    except ValueError:
+        previous = cache.get(previous_key, 0) % WINDOW_SHIFT
+        value = previous * WINDOW_SHIFT + 1
+        if cache.add(key, value, timeout):
+            return value
+        return cache.incr(key)
+
+
+def retry_after(limit, period, elapsed, previous, current):
+    """Через сколько секунд следующий запрос уложится в лимит."""
+    if current < limit and previous:
+        # Место освободится, когда вес предыдущего окна упадёт.
+        share = 1 - (limit - 1 - current) / previous
+        wait = share * period - elapsed
+    else:
+        # Текущее окно заполнено: ждать следующего, где оно станет
+        # предыдущим и его вес упадёт достаточно.
+        share = 1 - (limit - 1) / current if current else 0
+        wait = period - elapsed + share * period
+    return max(1, math.ceil(wait))
+
+
+def check(name, ident, now=None):
+    """Засчитывает запрос и возвращает, сколько секунд ждать, или 0.
+
+    Имя без лимита в ``settings.RATELIMITS`` не ограничивается.
+    Отказанные запросы не засчитываются.
+    """
+    rate = settings.RATELIMITS.get(name)
+    if not rate:
+        return 0
+    limit, period = parse_rate(rate)
+    now = time.time() if now is None else now
+    window = int(now // period)
+    elapsed = now - window * period
+    key = f'ratelimit:{name}:{ident}:{{}}'
+    current_key = key.format(window)
+    # Ключ окна нужен и следующему окну: оттуда берётся его счётчик.
+    value = hit(current_key, key.format(window - 1), 2 * period + 1)
+    previous, current = divmod(value, WINDOW_SHIFT)
+    if previous * (1 - elapsed / period) + current > limit:
+        cache.decr(current_key)
+        return retry_after(limit, period, elapsed, previous, current - 1)
+    return 0
+
+
+def ratelimit(name, methods=('POST',)):
+    """Отвечает 429 с ``Retry-After``, когда лимит ``name`` исчерпан.
+
+    Считаются только запросы методов ``methods``: показ формы не пишет
+    в базу и не ограничивается.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                retry_after = check(name, client_key(request))
+                if retry_after:
+                    response = HttpResponse(
+                        'Слишком много запросов, попробуйте позже.',
+                        content_type='text/plain; charset=utf-8',
+                        status=TOO_MANY_REQUESTS,
+                    )
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
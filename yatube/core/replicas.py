@@ -0,0 +1,72 @@
+"""Чтение с реплик для представлений, которые только читают.
+
+Представление помечается декоратором ``read_replica``, а
+``ReplicaMiddleware`` на время такого GET-запроса включает чтение с
+реплик из ``settings.DATABASE_REPLICAS``. Запись и все остальные
+запросы всегда идут в ``default``. После успешного POST пользователь
+получает cookie, и на ``settings.REPLICA_STICKY_SECONDS`` секунд его
+чтения тоже идут в ``default``, чтобы он сразу видел свои изменения.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Приложения, чьи таблицы копируются на реплики. Сессии читаются только
+# с основной базы: свежий вход не должен теряться из-за отставания.
+REPLICATED_APPS = {'posts', 'auth'}
+STICKY_COOKIE = 'primary_sticky'
+
+_local = threading.local()
+
+
+def read_replica(view):
+    """Помечает представление как только читающее."""
+    view.read_replica = True
+    return view
+
+
+def use_replicas(enabled):
+    """Включает или выключает чтение с реплик в текущем потоке."""
+    _local.enabled = enabled
+
+
+@contextmanager
+def replica_reads():
+    previous = replica_reads_enabled()
+    use_replicas(True)
+    try:
+        yield
+    finally:
+        use_replicas(previous)
+
+
+def replica_reads_enabled():
+    return getattr(_local, 'enabled', False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            replicas
+            and replica_reads_enabled()
+            and model._meta.app_label in REPLICATED_APPS
+        ):
+            return random.choice(replicas)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики — копии основной базы и сами не мигрируются.
+        return db not in settings.DATABASE_REPLICAS
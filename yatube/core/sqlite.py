@@ -0,0 +1,45 @@
+"""Настройка каждого нового соединения с SQLite.
+
+Прагмы из ``settings.SQLITE_PRAGMAS`` выполняются по сигналу
+``connection_created`` для всех SQLite-баз проекта. ``journal_mode``
+хранится в самом файле базы, остальные прагмы действуют только на
+время соединения, поэтому их и ставят на каждом.
+"""
+from django.conf import settings
+
+# Прагмы, которые можно задавать в настройках, и допустимые значения
+# (None — целое число).
+PRAGMAS = {
+    'journal_mode': {'delete', 'truncate', 'persist', 'memory', 'wal'},
+    'synchronous': {'off', 'normal', 'full', 'extra'},
+    'temp_store': {'default', 'file', 'memory'},
+    'mmap_size': None,
+    'cache_size': None,
+    'busy_timeout': None,
+}
+
+
+def pragma_statements(pragmas):
+    """SQL для словаря прагм; неизвестные имена и значения — ошибка."""
+    statements = []
+    for name, value in pragmas.items():
+        if name not in PRAGMAS:
+            raise ValueError(f'Неизвестная прагма SQLite: {name}')
+        allowed = PRAGMAS[name]
+        if allowed is None:
+            value = int(value)
+        elif str(value).lower() not in allowed:
+            raise ValueError(f'Недопустимое значение {name}: {value}')
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    statements = pragma_statements(settings.SQLITE_PRAGMAS)
+    if not statements:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
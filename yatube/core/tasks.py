@@ -0,0 +1,159 @@
+"""Фоновые задачи в пуле потоков текущего процесса.
+
+``defer(task, *items)`` откладывает вызов ``task`` до фиксации текущей
+транзакции (``transaction.on_commit``) и выполняет его в пуле потоков,
+так что представление отвечает, как только строка записана. Задача
+принимает список элементов: элементы, отложенные для одной задачи, пока
+она ждёт своей очереди, склеиваются в одну пачку и обрабатываются
+одним вызовом. Упавший вызов повторяется до
+``settings.TASKS_MAX_RETRIES`` раз с растущей паузой; паузу отсчитывает
+таймер, а не поток пула, так что остальные задачи в это время идут.
+
+Очередь живёт в памяти процесса: задачи, не успевшие выполниться до
+его падения, теряются. Поэтому задачи должны быть повторяемыми, а у
+их результата — способ восстановления вроде команды
+``fan_out_recent_posts``.
+При ``settings.TASKS_EAGER`` задачи выполняются сразу и в том же
+потоке; так работают тесты, где транзакция теста не фиксируется.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def task_name(task):
+    return f'{task.__module__}.{task.__qualname__}'
+
+
+class TaskQueue:
+    def __init__(self, workers, max_retries, retry_delay):
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='tasks'
+        )
+        # Повторный захват нужен колбэку завершения, который вызывается
+        # сразу в schedule(), если задача уже успела выполниться.
+        self.lock = threading.RLock()
+        # Пачки задач, которые ещё не начали выполняться.
+        self.pending = {}
+        self.futures = set()
+        # Таймеры повторов: пока пауза идёт, поток пула свободен.
+        self.timers = set()
+
+    def submit(self, task, items):
+        with self.lock:
+            batch = self.pending.get(task)
+            if batch is not None:
+                batch.extend(items)
+                return
+            self.pending[task] = list(items)
+            self.schedule(self.run_batch, task)
+
+    def schedule(self, func, *args):
+        with self.lock:
+            future = self.executor.submit(func, *args)
+            self.futures.add(future)
+        future.add_done_callback(self.forget)
+
+    def forget(self, future):
+        with self.lock:
+            self.futures.discard(future)
+
+    def run_batch(self, task):
+        with self.lock:
+            items = self.pending.pop(task)
+        self.attempt(task, items, 0)
+
+    def attempt(self, task, items, attempt):
+        try:
+            task(items)
+        except Exception:
+            if attempt == self.max_retries:
+                logger.exception(
+                    'Задача %s не выполнена (%s элементов)',
+                    task_name(task),
+                    len(items),
+                )
+                return
+            logger.warning(
+                'Задача %s упала, повтор %s',
+                task_name(task),
+                attempt + 1,
+                exc_info=True,
+            )
+            timer = threading.Timer(
+                self.retry_delay * (attempt + 1),
+                self.retry,
+                (task, items, attempt + 1),
+            )
+            timer.daemon = True
+            with self.lock:
+                self.timers.add(timer)
+            timer.start()
+        finally:
+            # Соединения с базой у каждого потока свои.
+            connections.close_all()
+
+    def retry(self, task, items, attempt):
+        with self.lock:
+            self.schedule(self.attempt, task, items, attempt)
+            self.timers.discard(threading.current_thread())
+
+    def join(self):
+        """Ждёт, пока выполнятся все поставленные задачи, включая
+        поставленные и повторённые во время ожидания."""
+        while True:
+            with self.lock:
+                futures = [
+                    future for future in self.futures if not future.done()
+                ]
+                timers = list(self.timers)
+            if not futures and not timers:
+                return
+            wait(futures)
+            for timer in timers:
+                timer.join()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = TaskQueue(
+                settings.TASKS_WORKERS,
+                settings.TASKS_MAX_RETRIES,
+                settings.TASKS_RETRY_DELAY,
+            )
+        return _queue
+
+
+def defer(task, *items):
+    """Выполняет ``task`` с пачкой, куда войдут ``items``, после
+    фиксации текущей транзакции."""
+    if settings.TASKS_EAGER:
+        task(list(items))
+        return
+    transaction.on_commit(lambda: get_queue().submit(task, items))
+
+
+def after_commit(func):
+    """Выполняет ``func`` в текущем потоке после фиксации транзакции.
+
+    Для быстрых действий, которым не нужен пул, но нельзя опережать
+    фиксацию, — например, сброса кеша. При ``settings.TASKS_EAGER``
+    выполняет сразу.
+    """
+    if settings.TASKS_EAGER:
+        func()
+        return
+    transaction.on_commit(func)
@@ -0,0 +1,32 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag
+def elided_page_range(page_obj, on_each_side=2, on_ends=1):
+    """Номера страниц вокруг текущей и по краям; None — пропуск.
+
+    Повторяет ``Paginator.get_elided_page_range`` из Django 3.2: пропуск
+    ставится, только если он скрывает больше одной страницы. В отличие
+    от ``paginator.page_range`` длина списка не зависит от числа
+    страниц: не больше ``2 * (on_each_side + on_ends) + 3``.
+    """
+    number = page_obj.number
+    num_pages = page_obj.paginator.num_pages
+    if num_pages <= 2 * (on_each_side + on_ends):
+        return list(range(1, num_pages + 1))
+    pages = []
+    if number > on_each_side + on_ends + 2:
+        pages.extend(range(1, on_ends + 1))
+        pages.append(None)
+        pages.extend(range(number - on_each_side, number + 1))
+    else:
+        pages.extend(range(1, number + 1))
+    if number < num_pages - on_each_side - on_ends - 1:
+        pages.extend(range(number + 1, number + on_each_side + 1))
+        pages.append(None)
+        pages.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        pages.extend(range(number + 1, num_pages + 1))
+    return pages
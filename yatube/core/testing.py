@@ -0,0 +1,89 @@
+from contextlib import ContextDecorator, contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Запуск тестов с фоновыми задачами в том же потоке.
+
+    Транзакция ``TestCase`` не фиксируется, и ``on_commit`` в ней не
+    срабатывает, поэтому задачи из ``core.tasks`` выполняются сразу.
+    Для pytest то же делает фикстура ``tests/fixtures/fixture_tasks.py``.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.eager_tasks = override_settings(TASKS_EAGER=True)
+        self.eager_tasks.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.eager_tasks.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+@contextmanager
+def capture_on_commit_callbacks(using=DEFAULT_DB_ALIAS, execute=False):
+    """Собирает функции ``on_commit``, отложенные внутри блока.
+
+    Транзакция теста не фиксируется, поэтому функции можно выполнить
+    вручную или сразу по выходу из блока при ``execute``.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    callbacks = []
+    try:
+        yield callbacks
+    finally:
+        callbacks[:] = [
+            func for _, func in connection.run_on_commit[start:]
+        ]
+        if execute:
+            for callback in callbacks:
+                callback()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    """Проверяет, что блок кода уложился в заданное число SQL-запросов.
+
+    Работает и как контекстный менеджер, и как декоратор::
+
+        with query_budget(5):
+            client.get(url)
+
+        @query_budget(5)
+        def test_feed(self):
+            ...
+    """
+
+    def __init__(self, budget, using=DEFAULT_DB_ALIAS):
+        self.budget = budget
+        self.using = using
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        return self.context
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return False
+        executed = len(self.context)
+        if executed > self.budget:
+            queries = '\n'.join(
+                f'{number}. {query["sql"]}'
+                for number, query in enumerate(
+                    self.context.captured_queries, start=1
+                )
+            )
+            raise QueryBudgetExceeded(
+                f'Выполнено {executed} SQL-запросов, '
+                f'бюджет {self.budget}:\n{queries}'
+            )
+        return False
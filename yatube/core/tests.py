@@ -0,0 +1,379 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.http import HttpResponse
+from django.template import engines
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.urls import reverse
+
+from core.management.commands.benchmark_templates import (
+    cached_templates_settings
+)
+from core.middleware import ReplicaMiddleware
+from core.ratelimit import (
+    TOO_MANY_REQUESTS, check, client_ip, parse_rate, ratelimit
+)
+from core.replicas import (
+    STICKY_COOKIE, ReplicaRouter, read_replica, replica_reads
+)
+from core.sqlite import apply_pragmas, pragma_statements
+from core.tasks import TaskQueue, defer
+from core.templatetags.pagination import elided_page_range
+from core.warmup import reset_templates, warm_templates
+from posts.models import Post, User
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Byblik')
+        cls.post = Post.objects.create(author=cls.user, text='Текст')
+
+    def get_detail(self):
+        return Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_has_server_timing(self):
+        """Профилированный запрос отдаёт Server-Timing и пишет лог."""
+        with self.assertLogs('core.profiling', 'INFO') as logs:
+            response = self.get_detail()
+        timing = response['Server-Timing']
+        for name in ('sql', 'tpl', 'view', 'total'):
+            self.assertIn(f'{name};dur=', timing)
+        record = json.loads(logs.output[0].split(':', 2)[2])
+        self.assertEqual(record['status'], 200)
+        self.assertEqual(record['queries'], 1)
+        self.assertGreater(record['tpl_ms'], 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_disabled_by_default(self):
+        """При нулевой доле заголовка нет."""
+        self.assertFalse(self.get_detail().has_header('Server-Timing'))
+
+
+class TemplateWarmupTests(TestCase):
+
+    def test_warmup_fills_cached_loader(self):
+        """Прогрев кладёт все шаблоны каталога в кеширующий загрузчик."""
+        with override_settings(TEMPLATES=cached_templates_settings()):
+            loader = engines['django'].engine.template_loaders[0]
+            reset_templates()
+            compiled = warm_templates()
+            self.assertGreater(compiled, 0)
+            self.assertIn('base.html', loader.get_template_cache)
+            self.assertIn('posts/index.html', loader.get_template_cache)
+            reset_templates()
+            self.assertEqual(loader.get_template_cache, {})
+
+    def test_warmup_skipped_without_cached_loader(self):
+        """При отладке загрузчики не кешируют, и прогрев пропускается."""
+        templates = [
+            {**config, 'OPTIONS': {**config['OPTIONS'], 'debug': True}}
+            for config in settings.TEMPLATES
+        ]
+        with override_settings(TEMPLATES=templates):
+            self.assertEqual(warm_templates(), 0)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.read_from = None
+
+        @read_replica
+        def marked_view(request):
+            return self.view(request)
+
+        self.marked_view = marked_view
+
+    def view(self, request):
+        self.read_from = self.router.db_for_read(Post)
+        return HttpResponse()
+
+    def send(self, request, view):
+        middleware = ReplicaMiddleware(lambda request: view(request))
+        middleware.process_view(request, view, (), {})
+        return middleware(request)
+
+    def test_router(self):
+        """С реплик читаются только посты и пользователи и только
+        внутри помеченного представления; пишется всё в default."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            self.assertEqual(self.router.db_for_read(User), 'replica')
+            self.assertEqual(self.router.db_for_read(Session), 'default')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+
+    def test_marked_view_reads_from_replica(self):
+        """Помеченное представление на GET читает с реплики."""
+        self.send(self.factory.get('/'), self.marked_view)
+        self.assertEqual(self.read_from, 'replica')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_unmarked_view_reads_from_primary(self):
+        """Непомеченное представление читает из default."""
+        self.send(self.factory.get('/'), self.view)
+        self.assertEqual(self.read_from, 'default')
+
+    def test_write_makes_reads_sticky(self):
+        """После POST чтения автора идут в default."""
+        response = self.send(self.factory.post('/'), self.view)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        self.send(request, self.marked_view)
+        self.assertEqual(self.read_from, 'default')
+
+
+class SqlitePragmaTests(TestCase):
+
+    def test_pragma_statements(self):
+        """Прагмы превращаются в SQL, чужие имена и значения — ошибка."""
+        self.assertEqual(
+            pragma_statements({'journal_mode': 'wal', 'cache_size': -2000}),
+            ['PRAGMA journal_mode = wal', 'PRAGMA cache_size = -2000'],
+        )
+        for pragmas in (
+            {'writable_schema': 'on'},
+            {'synchronous': 'off; DROP TABLE posts_post'},
+            {'busy_timeout': '1; DROP TABLE posts_post'},
+        ):
+            with self.subTest(pragmas=pragmas):
+                with self.assertRaises(ValueError):
+                    pragma_statements(pragmas)
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_pragmas_applied_to_connection(self):
+        """Прагмы из настроек выполняются на соединении."""
+        apply_pragmas(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+
+class ElidedPageRangeTests(SimpleTestCase):
+
+    def pages(self, number, count):
+        page_obj = Paginator(range(count), 1).page(number)
+        return elided_page_range(page_obj)
+
+    def test_short_range_not_elided(self):
+        """Короткая лента выводит все страницы."""
+        self.assertEqual(self.pages(3, 7), [1, 2, 3, 4, 5, 6, 7])
+
+    def test_long_range_elided(self):
+        """Длинная лента выводит края и соседей текущей страницы."""
+        self.assertEqual(self.pages(1, 100000), [1, 2, 3, None, 100000])
+        self.assertEqual(
+            self.pages(500, 100000),
+            [1, None, 498, 499, 500, 501, 502, None, 100000],
+        )
+        self.assertEqual(
+            self.pages(100000, 100000), [1, None, 99998, 99999, 100000]
+        )
+
+    def test_single_page_gap_not_elided(self):
+        """Пропуск длиной в одну страницу заменяется самой страницей."""
+        self.assertEqual(
+            self.pages(5, 100), [1, 2, 3, 4, 5, 6, 7, None, 100]
+        )
+        self.assertEqual(
+            self.pages(96, 100), [1, None, 94, 95, 96, 97, 98, 99, 100]
+        )
+        self.assertEqual(
+            self.pages(6, 100), [1, None, 4, 5, 6, 7, 8, None, 100]
+        )
+
+
+@override_settings(RATELIMITS={'test': '5/m'})
+class RateLimitTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+        @ratelimit('test')
+        def view(request):
+            return HttpResponse()
+
+        self.view = view
+
+    def send(self, method='post', address='127.0.0.1'):
+        request = getattr(self.factory, method)('/', REMOTE_ADDR=address)
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/m'), (10, 60))
+        self.assertEqual(parse_rate('5/h'), (5, 3600))
+
+    def test_limit_returns_429_with_retry_after(self):
+        """Сверх лимита POST получает 429, окно считается отдельно для
+        каждого адреса, а GET не ограничивается."""
+        for _ in range(5):
+            self.assertEqual(self.send().status_code, 200)
+        response = self.send()
+        self.assertEqual(response.status_code, TOO_MANY_REQUESTS)
+        # В скользящем окне ждать можно дольше периода: запросы
+        # текущего окна ещё учитываются и в следующем.
+        self.assertTrue(1 <= int(response['Retry-After']) <= 120)
+        self.assertEqual(self.send(address='10.0.0.1').status_code, 200)
+        self.assertEqual(self.send(method='get').status_code, 200)
+
+    def test_window_slides(self):
+        """Запросы прошлого окна учитываются с убывающим весом, так что
+        на стыке окон лимит не удваивается."""
+        for _ in range(5):
+            self.assertEqual(check('test', 'ip:1', now=60), 0)
+        for _ in range(3):
+            self.assertEqual(check('test', 'ip:1', now=75), 57)
+        # Отказы не засчитаны: в новом окне прошлое весит как 5.
+        self.assertEqual(check('test', 'ip:1', now=120), 12)
+        self.assertEqual(check('test', 'ip:1', now=132), 0)
+        self.assertEqual(check('test', 'ip:1', now=133), 11)
+
+    def test_one_cache_call_per_check(self):
+        """Кроме первого запроса окна, проверка — одно обращение к кешу."""
+        check('test', 'ip:1', now=60)
+        with mock.patch('core.ratelimit.cache', wraps=cache) as spy:
+            self.assertEqual(check('test', 'ip:1', now=61), 0)
+        self.assertEqual([call[0] for call in spy.method_calls], ['incr'])
+
+    @override_settings(RATELIMIT_TRUSTED_PROXIES=1)
+    def test_ip_behind_proxy(self):
+        """За прокси адрес берётся из X-Forwarded-For, дописанного
+        прокси, а не из подставленного клиентом."""
+        request = self.factory.post(
+            '/',
+            REMOTE_ADDR='10.0.0.1',
+            HTTP_X_FORWARDED_FOR='6.6.6.6, 1.2.3.4',
+        )
+        self.assertEqual(client_ip(request), '1.2.3.4')
+        with override_settings(RATELIMIT_TRUSTED_PROXIES=0):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+
+    def test_limit_holds_under_concurrency(self):
+        """Из одновременных запросов одного окна проходят ровно лимит."""
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            waits = list(executor.map(
+                lambda _: check('test', 'ip:1', now=60), range(200)
+            ))
+        self.assertEqual(waits.count(0), 5)
+
+
+@override_settings(RATELIMITS={'post_create': '2/m', 'signup': '1/h'})
+class RateLimitedViewsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_create_limited_per_user(self):
+        user = User.objects.create_user(username='Byblik')
+        client = Client()
+        client.force_login(user)
+        address = reverse('posts:post_create')
+        for number in range(2):
+            client.post(address, {'text': f'Пост {number}'})
+        response = client.post(address, {'text': 'Лишний пост'})
+        self.assertEqual(response.status_code, TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(Post.objects.filter(author=user).count(), 2)
+
+    def test_signup_limited_per_ip(self):
+        address = reverse('users:signup')
+        Client().post(address, {})
+        response = Client().post(address, {})
+        self.assertEqual(response.status_code, TOO_MANY_REQUESTS)
+
+
+class TaskQueueTests(SimpleTestCase):
+
+    def setUp(self):
+        self.queue = TaskQueue(workers=1, max_retries=2, retry_delay=0)
+        self.calls = []
+
+    def test_similar_jobs_batched(self):
+        """Элементы, отложенные, пока задача ждёт очереди, приходят
+        одной пачкой."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def blocker(items):
+            started.set()
+            release.wait()
+
+        def task(items):
+            self.calls.append(items)
+
+        self.queue.submit(blocker, [None])
+        started.wait()
+        for item in range(3):
+            self.queue.submit(task, [item])
+        release.set()
+        self.queue.join()
+        self.assertEqual(self.calls, [[0, 1, 2]])
+
+    def test_failed_task_retried(self):
+        """Упавшая задача повторяется, пока не выполнится."""
+        def task(items):
+            self.calls.append(items)
+            if len(self.calls) < 3:
+                raise RuntimeError
+
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.queue.submit(task, [1])
+            self.queue.join()
+        self.assertEqual(len(self.calls), 3)
+
+    def test_retry_does_not_hold_worker(self):
+        """Пока упавшая задача ждёт повтора, единственный поток пула
+        выполняет другие задачи."""
+        queue = TaskQueue(workers=1, max_retries=1, retry_delay=0.5)
+
+        def failing(items):
+            self.calls.append('failing')
+            if self.calls.count('failing') == 1:
+                raise RuntimeError
+
+        def other(items):
+            self.calls.append('other')
+
+        with self.assertLogs('core.tasks', 'WARNING'):
+            queue.submit(failing, [1])
+            queue.submit(other, [1])
+            queue.join()
+        self.assertEqual(self.calls, ['failing', 'other', 'failing'])
+
+    def test_retries_exhausted(self):
+        """После всех повторов ошибка пишется в лог."""
+        def task(items):
+            self.calls.append(items)
+            raise RuntimeError
+
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.queue.submit(task, [1])
+            self.queue.join()
+        self.assertEqual(len(self.calls), 3)
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_runs_inline(self):
+        defer(self.calls.append, 1, 2)
+        self.assertEqual(self.calls, [[1, 2]])
@@ -0,0 +1,63 @@
+"""Прогрев кеша шаблонов при запуске рабочего процесса."""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(directory):
+    """Имена всех шаблонов каталога относительно него самого."""
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            path = os.path.relpath(os.path.join(root, filename), directory)
+            yield path.replace(os.sep, '/')
+
+
+def is_cached(engine):
+    """Держит ли движок скомпилированные шаблоны в памяти процесса.
+
+    Django сам оборачивает загрузчики в кеширующий, когда ``DEBUG``
+    выключен и ``loaders`` не заданы явно; при отладке кеша нет.
+    """
+    return any(
+        isinstance(loader, CachedLoader) for loader in engine.template_loaders
+    )
+
+
+def warm_templates():
+    """Компилирует все шаблоны из ``DIRS`` движков Django.
+
+    С кеширующим загрузчиком скомпилированные шаблоны остаются в
+    памяти процесса, и первый запрос не тратит время на разбор. Без
+    него прогревать нечего, и движок пропускается. Возвращает число
+    скомпилированных шаблонов.
+    """
+    compiled = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        if not is_cached(backend.engine):
+            continue
+        for directory in backend.engine.dirs:
+            for name in template_names(directory):
+                try:
+                    backend.engine.get_template(name)
+                except TemplateSyntaxError:
+                    logger.exception('Не удалось скомпилировать %s', name)
+                    continue
+                compiled += 1
+    return compiled
+
+
+def reset_templates():
+    """Очищает кеши загрузчиков шаблонов, как после перезапуска."""
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for loader in backend.engine.template_loaders:
+            if hasattr(loader, 'reset'):
+                loader.reset()
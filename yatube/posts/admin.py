@@ -1,6 +1,20 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
 
+from . import moderation
 from .models import Post, Group
+from .paginators import EstimatedCountPaginator
+from .search import filter_posts
+
+
+class PostActionForm(helpers.ActionForm):
+    group_slug = forms.CharField(
+        label='Slug группы',
+        required=False,
+        help_text='Куда перенести посты; пусто — убрать из группы.',
+    )
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -11,11 +25,91 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
+    # Автор и группа приходят одним JOIN, а не запросом на строку.
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
+    # Фильтр по дате задаёт диапазон pub_date, который идёт по индексу,
+    # в отличие от date_hierarchy, перебирающей все даты таблицы.
     list_filter = ('pub_date',)
-    list_editable = ('group',)
+    ordering = ('-pub_date',)
+    # Поля со списком всех авторов и групп заменены поиском.
+    autocomplete_fields = ('author', 'group')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+    action_form = PostActionForm
+    actions = ('move_posts', 'delete_posts')
+
+    def get_actions(self, request):
+        # Стандартное удаление грузит каждый пост и шлёт сигналы на
+        # каждую строку; его заменяет delete_posts.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def move_posts(self, request, queryset):
+        slug = request.POST.get('group_slug', '').strip()
+        group = None
+        if slug:
+            group = Group.objects.filter(slug=slug).first()
+            if group is None:
+                self.message_user(
+                    request, f'Группы {slug!r} нет.', messages.ERROR
+                )
+                return None
+        moved = moderation.move_posts(queryset, group)
+        self.message_user(
+            request,
+            f'Перенесено постов: {moved}.',
+            messages.SUCCESS,
+        )
+        return None
+
+    move_posts.short_description = 'Перенести в группу из поля «Slug группы»'
+    move_posts.allowed_permissions = ('change',)
+
+    def delete_posts(self, request, queryset):
+        if request.POST.get('post') == 'yes':
+            deleted = moderation.delete_posts(queryset)
+            self.message_user(
+                request,
+                f'Удалено постов: {deleted}.',
+                messages.SUCCESS,
+            )
+            return None
+        select_across = request.POST.get('select_across') == '1'
+        return TemplateResponse(
+            request,
+            'admin/posts/post/delete_posts_confirmation.html',
+            {
+                **self.admin_site.each_context(request),
+                'title': 'Удаление постов',
+                'opts': self.model._meta,
+                'count': queryset.count(),
+                'select_across': select_across,
+                'changelist_url': request.get_full_path(),
+                'selected': request.POST.getlist(
+                    helpers.ACTION_CHECKBOX_NAME
+                ),
+                'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            },
+        )
+
+    delete_posts.short_description = 'Удалить выбранные посты'
+    delete_posts.allowed_permissions = ('delete',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по полнотекстовому индексу вместо LIKE '%term%'.
+        if not search_term.strip():
+            return queryset, False
+        return filter_posts(queryset, search_term), False
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug', 'posts_count')
+    search_fields = ('title', 'slug')
     empty_value_display = '-пусто-'
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
@@ -0,0 +1,107 @@
+"""Read-only JSON-версии лент для мобильных клиентов.
+
+Ленты отдаются курсорными страницами по ``?after=``/``?before=``.
+``ETag`` складывается из версии области кеша, которую сдвигает любое
+изменение постов области, даты самого нового поста и параметров
+запроса. Он получается одним запросом по индексу и значением из кеша,
+поэтому на неизменившуюся ленту клиент получает ``304`` без
+сериализации. ``Last-Modified`` не отдаётся: дата самого нового поста
+не меняется при правке или удалении старых постов, и ответ по
+``If-Modified-Since`` оказался бы устаревшим.
+"""
+import hashlib
+from functools import wraps
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_GET
+
+from .cache import AUTHOR_SCOPE, GLOBAL_SCOPE, GROUP_SCOPE, get_scope_version
+from .models import Group, Post, User
+from .paginators import CursorPaginator
+
+NUMBER_POSTS = 10
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+POST_FIELDS = ('text', 'pub_date', 'author__username', 'group__slug')
+
+
+def scope_posts(scope, value):
+    if scope == GROUP_SCOPE:
+        return Post.objects.filter(group__slug=value)
+    if scope == AUTHOR_SCOPE:
+        return Post.objects.filter(author__username=value)
+    return Post.objects.all()
+
+
+def conditional_feed(scope, kwarg=None):
+    """Отвечает ``304``, если лента области не менялась.
+
+    ``scope`` и ``kwarg`` значат то же, что в ``cache_anonymous_page``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            value = None if kwarg is None else kwargs[kwarg]
+            full_scope = scope if kwarg is None else f'{scope}:{value}'
+            newest = scope_posts(scope, value).order_by(
+                '-pub_date'
+            ).values_list('pub_date', flat=True).first()
+            raw = (
+                f'{full_scope}:{get_scope_version(full_scope)}:'
+                f'{newest}:'
+                f'{request.GET.urlencode()}'
+            )
+            etag = hashlib.md5(raw.encode()).hexdigest()
+            return condition(
+                etag_func=lambda *args, **kwargs: etag,
+            )(view)(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+    }
+
+
+def feed_response(request, queryset):
+    posts = queryset.select_related('author', 'group').only(
+        *POST_FIELDS
+    ).order_by('-pub_date', '-id')
+    page = CursorPaginator(posts, NUMBER_POSTS).get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return JsonResponse(
+        {
+            'results': [serialize_post(post) for post in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        },
+        json_dumps_params=JSON_PARAMS,
+    )
+
+
+@require_GET
+@conditional_feed(GLOBAL_SCOPE)
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@require_GET
+@conditional_feed(GROUP_SCOPE, 'slug')
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, Post.objects.filter(group=group))
+
+
+@require_GET
+@conditional_feed(AUTHOR_SCOPE, 'username')
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, author.posts.all())
@@ -0,0 +1,249 @@
+"""Нагрузочный прогон адресов posts и users на тестовом клиенте.
+
+``seed()`` наполняет базу заданным числом пользователей, групп и
+постов, ``build_routes()`` подставляет в каждый адрес из
+``posts/urls.py`` и ``users/urls.py`` существующие объекты, а
+``run_route()`` гоняет адрес с заданной параллельностью и возвращает
+задержки, число SQL-запросов и пропускную способность.
+"""
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import StringIO
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from posts import urls as posts_urls
+from posts.inbox import follow
+from posts.models import Group, Post, User, render_text_html
+from users import urls as users_urls
+
+SEED_BATCH_SIZE = 500
+SEED_FOLLOWS = 10
+BENCHMARK_USERNAME = 'benchmark'
+# Адреса, которые принимают только POST.
+POST_ONLY = {'posts:profile_follow', 'posts:profile_unfollow'}
+# Параметры запроса для адресов, которым без них нечего показать.
+ROUTE_QUERIES = {'posts:search': {'q': 'нагрузочного'}}
+PERCENTILES = (50, 95, 99)
+
+
+@contextmanager
+def benchmark_database(using=DEFAULT_DB_ALIAS):
+    """Временная тестовая база на время прогона.
+
+    База в файле, а не в памяти: потоки ходят в неё через свои
+    соединения, как рабочие процессы сервера.
+    """
+    connection = connections[using]
+    tmp_dir = tempfile.mkdtemp()
+    connection.settings_dict['TEST'] = {
+        **connection.settings_dict.get('TEST', {}),
+        'NAME': os.path.join(tmp_dir, 'benchmark.sqlite3'),
+    }
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']
+        ):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def write_report(stdout, report, path=None):
+    """Печатает отчёт в JSON или пишет его в файл ``path``."""
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if path:
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(output + '\n')
+    else:
+        stdout.write(output)
+
+
+def bulk_create_batched(model, objects):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == SEED_BATCH_SIZE:
+            model.objects.bulk_create(batch)
+            batch = []
+    model.objects.bulk_create(batch)
+
+
+def seed(users, groups, posts, random_seed=0):
+    """Наполняет базу данными для прогона и возвращает его автора.
+
+    Пользователь ``benchmark`` пишет часть постов и подписан на
+    нескольких авторов, чтобы у его страниц были данные.
+    """
+    rng = random.Random(random_seed)
+    bulk_create_batched(User, (
+        User(username=f'user{number}', password='!')
+        for number in range(users)
+    ))
+    bulk_create_batched(Group, (
+        Group(
+            title=f'Группа {number}',
+            slug=f'group{number}',
+            description=f'Описание группы {number}',
+        )
+        for number in range(groups)
+    ))
+    author = User.objects.create_user(username=BENCHMARK_USERNAME)
+    author_ids = list(User.objects.values_list('pk', flat=True))
+    group_ids = list(Group.objects.values_list('pk', flat=True)) or [None]
+    texts = (
+        f'Пост номер {number} для нагрузочного прогона'
+        for number in range(posts)
+    )
+    bulk_create_batched(Post, (
+        Post(
+            author_id=author.pk if number % 10 == 0 else rng.choice(
+                author_ids
+            ),
+            group_id=rng.choice(group_ids + [None]),
+            text=text,
+            text_html=render_text_html(text),
+        )
+        for number, text in enumerate(texts)
+    ))
+    # bulk_create обходит сигналы: счётчики сверяются одним проходом.
+    call_command('reconcile_post_counters', stdout=StringIO())
+    for followed in User.objects.exclude(pk=author.pk)[:SEED_FOLLOWS]:
+        follow(author, followed)
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return author
+
+
+def route_kwargs(author):
+    """Значения аргументов адресов для объектов из ``seed()``."""
+    group = Group.objects.order_by('pk').first()
+    post = author.posts.order_by('-pub_date').first()
+    followed = author.follower.select_related('author').first()
+    username = followed.author.username if followed else author.username
+    return {
+        'slug': group.slug if group else 'missing',
+        'username': username,
+        'post_id': post.pk if post else 0,
+        'file_format': 'jsonl',
+    }
+
+
+def build_routes(author):
+    """Список ``(имя, метод, адрес)`` для каждого адреса приложений."""
+    values = route_kwargs(author)
+    routes = []
+    for namespace, module in (('posts', posts_urls), ('users', users_urls)):
+        for pattern in module.urlpatterns:
+            name = f'{namespace}:{pattern.name}'
+            kwargs = {
+                key: values[key] for key in pattern.pattern.converters
+            }
+            method = 'post' if name in POST_ONLY else 'get'
+            address = reverse(name, kwargs=kwargs)
+            if name in ROUTE_QUERIES:
+                address += '?' + urlencode(ROUTE_QUERIES[name])
+            routes.append((name, method, address))
+    return routes
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    if not values:
+        return None
+    rank = max(1, -(-percent * len(values) // 100))
+    return values[rank - 1]
+
+
+def make_client(user):
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def timed_requests(user, method, address, count, using):
+    """Выполняет ``count`` запросов одним клиентом в текущем потоке."""
+    client = make_client(user)
+    send = getattr(client, method)
+    connection = connections[using]
+    samples = []
+    for _ in range(count):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = send(address)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        samples.append((elapsed, len(queries), response.status_code))
+    return samples
+
+
+def run_route(user, method, address, requests=100, concurrency=1,
+              using=DEFAULT_DB_ALIAS):
+    """Гоняет адрес и возвращает сводку задержек и запросов.
+
+    При ``concurrency`` больше единицы запросы делят между собой
+    потоки, у каждого свой клиент и своё соединение с базой.
+    """
+    per_worker = [
+        requests // concurrency + (worker < requests % concurrency)
+        for worker in range(concurrency)
+    ]
+    started = time.perf_counter()
+    if concurrency == 1:
+        samples = timed_requests(user, method, address, requests, using)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(
+                    timed_requests, user, method, address, count, using
+                )
+                for count in per_worker if count
+            ]
+            samples = [
+                sample for future in futures for sample in future.result()
+            ]
+    elapsed = time.perf_counter() - started
+    return summarize(samples, elapsed)
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(latency * 1000 for latency, _, _ in samples)
+    queries = [count for _, count, _ in samples]
+    statuses = Counter(status for _, _, status in samples)
+    return {
+        'requests': len(samples),
+        'statuses': {
+            str(status): total for status, total in sorted(statuses.items())
+        },
+        'latency_ms': {
+            **{
+                f'p{percent}': round(percentile(latencies, percent), 3)
+                for percent in PERCENTILES
+            },
+            'mean': round(sum(latencies) / len(latencies), 3),
+        },
+        'queries_per_request': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        },
+        'throughput_rps': round(len(samples) / elapsed, 1),
+    }
@@ -0,0 +1,176 @@
+import hashlib
+import time
+from functools import wraps
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import DEFERRED
+
+from .models import Group, User
+
+# Имена фрагментов {% cache %} с карточкой поста в шаблонах лент. Ключ
+# фрагмента — id и версия поста, так что правка текста или группы сама
+# уводит ленты на новую карточку.
+POST_FRAGMENTS = ('index_post', 'group_post', 'profile_post')
+FRAGMENT_BATCH_SIZE = 500
+
+
+def post_fragment_keys(posts):
+    """Ключи карточек для пар ``(id, версия)`` постов."""
+    return [
+        make_template_fragment_key(fragment, [post_id, version])
+        for post_id, version in posts
+        for fragment in POST_FRAGMENTS
+    ]
+
+
+def invalidate_post_fragments(posts):
+    """Сбрасывает текущие карточки постов во всех лентах.
+
+    ``posts`` — пары ``(id, версия)``. Нужно, когда меняется то, что
+    не поднимает версию поста: имя автора, адрес группы.
+    """
+    posts = list(posts)
+    for start in range(0, len(posts), FRAGMENT_BATCH_SIZE):
+        cache.delete_many(
+            post_fragment_keys(posts[start:start + FRAGMENT_BATCH_SIZE])
+        )
+
+
+GLOBAL_SCOPE = 'global'
+GROUP_SCOPE = 'group'
+AUTHOR_SCOPE = 'author'
+# Каталог групп: число постов, даты последних постов, названия.
+DIRECTORY_SCOPE = 'groups'
+
+
+def scope_version_key(scope):
+    return f'posts:version:{scope}'
+
+
+def new_version():
+    # Версия от времени, а не с нуля: если ключ версии вытеснили из
+    # кеша, старые страницы с прежними номерами не оживут.
+    return int(time.time() * 1000)
+
+
+def get_scope_version(scope):
+    key = scope_version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_scope_versions(scopes):
+    """Сдвигает версии областей, делая их закешированные страницы
+    недоступными."""
+    for scope in set(scopes):
+        try:
+            cache.incr(scope_version_key(scope))
+        except ValueError:
+            cache.set(scope_version_key(scope), new_version(), None)
+
+
+def feed_count_key(scope):
+    return f'posts:count:{scope}'
+
+
+def invalidate_feed_counts(scopes):
+    """Сбрасывает число постов лент; при изменении числа постов групп
+    сбрасывает и каталог групп."""
+    scopes = list(scopes)
+    cache.delete_many([feed_count_key(scope) for scope in scopes])
+    if any(scope.startswith(f'{GROUP_SCOPE}:') for scope in scopes):
+        invalidate_group_directory()
+
+
+def group_directory_key(after=None, before=None):
+    version = get_scope_version(DIRECTORY_SCOPE)
+    # Курсоры приходят из запроса: в ключ идёт их хеш, как в
+    # page_cache_key, чтобы memcached не отверг длинный или непечатный
+    # ключ.
+    raw = f'{after or ""}:{before or ""}'
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f'posts:groups:{version}:{digest}'
+
+
+def invalidate_group_directory():
+    bump_scope_versions([DIRECTORY_SCOPE])
+
+
+def group_scope(slug):
+    return f'{GROUP_SCOPE}:{slug}'
+
+
+def author_scope(username):
+    return f'{AUTHOR_SCOPE}:{username}'
+
+
+def page_cache_key(request, scope, version):
+    raw = f'{request.path}?{request.GET.urlencode()}'
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return f'posts:page:{scope}:{version}:{digest}'
+
+
+def cache_anonymous_page(scope, kwarg=None):
+    """Кеширует страницу для анонимных GET-запросов.
+
+    Ключ складывается из адреса, параметров запроса и версии области
+    ``scope`` (``global``, ``group`` или ``author``), уточнённой
+    значением аргумента ``kwarg`` представления. Срок жизни записи,
+    он же предельная задержка обновления, задаёт
+    ``settings.POSTS_PAGE_CACHE_TIMEOUT``; ``0`` выключает кеш.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = settings.POSTS_PAGE_CACHE_TIMEOUT
+            if (
+                not timeout
+                or request.method != 'GET'
+                or request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+            full_scope = scope if kwarg is None else (
+                f'{scope}:{kwargs[kwarg]}'
+            )
+            key = page_cache_key(
+                request, full_scope, get_scope_version(full_scope)
+            )
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == HTTPStatus.OK:
+                    cache.set(key, response, timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def feed_scopes(author_ids=(), group_ids=()):
+    """Области кеша страниц лент, где видны посты этих авторов и групп.
+
+    Всегда включает главную страницу.
+    """
+    author_ids = set(author_ids) - {None, DEFERRED}
+    group_ids = set(group_ids) - {None, DEFERRED}
+    scopes = [GLOBAL_SCOPE]
+    if author_ids:
+        scopes.extend(
+            author_scope(username)
+            for username in User.objects.filter(
+                pk__in=author_ids
+            ).values_list('username', flat=True)
+        )
+    if group_ids:
+        scopes.extend(
+            group_scope(slug)
+            for slug in Group.objects.filter(pk__in=group_ids).values_list(
+                'slug', flat=True
+            )
+        )
+    return scopes
@@ -0,0 +1,56 @@
+from collections import Counter
+
+from django.db.models import DEFERRED, F
+
+from .models import AuthorStats, Group
+
+
+def adjust_post_counts(author_deltas, group_deltas):
+    """Сдвигает счётчики постов авторов и групп на заданные величины.
+
+    ``author_deltas`` и ``group_deltas`` отображают id на изменение
+    счётчика. Вызывать внутри транзакции, меняющей сами посты.
+    """
+    for author_id, delta in author_deltas.items():
+        if not delta or author_id is None:
+            continue
+        updated = AuthorStats.objects.filter(author_id=author_id).update(
+            posts_count=F('posts_count') + delta
+        )
+        # Строка счётчика появляется с первым постом автора. При
+        # уменьшении её не создаём: автор может удаляться целиком.
+        if not updated and delta > 0:
+            AuthorStats.objects.create(author_id=author_id, posts_count=delta)
+    for group_id, delta in group_deltas.items():
+        if not delta or group_id is None:
+            continue
+        Group.objects.filter(pk=group_id).update(
+            posts_count=F('posts_count') + delta
+        )
+
+
+def post_saved(post, created):
+    author_deltas = Counter()
+    group_deltas = Counter()
+    if created:
+        author_deltas[post.author_id] += 1
+        group_deltas[post.group_id] += 1
+    else:
+        # Отложенное поле не загружалось и не могло измениться.
+        saved_author_id = post._saved_author_id
+        if saved_author_id is not DEFERRED and (
+            saved_author_id != post.author_id
+        ):
+            author_deltas[saved_author_id] -= 1
+            author_deltas[post.author_id] += 1
+        saved_group_id = post._saved_group_id
+        if saved_group_id is not DEFERRED and (
+            saved_group_id != post.group_id
+        ):
+            group_deltas[saved_group_id] -= 1
+            group_deltas[post.group_id] += 1
+    adjust_post_counts(author_deltas, group_deltas)
+
+
+def post_deleted(post):
+    adjust_post_counts({post.author_id: -1}, {post.group_id: -1})
@@ -0,0 +1,64 @@
+"""Каталог групп с числом постов и датой последнего поста.
+
+Страница каталога читается одним запросом: число постов берётся из
+счётчика ``Group.posts_count``, дата последнего поста — подзапросом,
+который для каждой показанной группы берёт одну запись индекса
+``(group, pub_date)``. Агрегат ``Max`` с ``GROUP BY`` читал бы все
+посты всех групп. Страницы строятся по ключу ``slug``
+без ``OFFSET`` и кешируются под версией области ``groups``, которую
+сдвигает ``cache.invalidate_group_directory()``.
+"""
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.db.models import OuterRef, Subquery
+
+from . import cache
+from .models import Group, Post
+from .paginators import CursorPage
+
+GROUPS_PER_PAGE = 20
+
+
+def fetch_groups(after=None, before=None, per_page=GROUPS_PER_PAGE):
+    """Читает до ``per_page + 1`` групп после или до ``slug``.
+
+    Возвращает группы по возрастанию ``slug`` и признак того, что в
+    этом направлении есть ещё.
+    """
+    last_pub_date = Post.objects.filter(group=OuterRef('pk')).order_by(
+        '-pub_date'
+    ).values('pub_date')[:1]
+    groups = Group.objects.annotate(
+        last_pub_date=Subquery(last_pub_date)
+    ).values(
+        'slug', 'title', 'description', 'posts_count', 'last_pub_date'
+    ).order_by('slug')
+    if after:
+        groups = groups.filter(slug__gt=after)
+    elif before:
+        groups = groups.filter(slug__lt=before).reverse()
+    groups = list(groups[:per_page + 1])
+    has_more = len(groups) > per_page
+    groups = groups[:per_page]
+    if not after and before:
+        groups.reverse()
+    return groups, has_more
+
+
+def directory_page(after=None, before=None, per_page=GROUPS_PER_PAGE):
+    """Страница каталога; курсоры ``next``/``previous`` — это slug."""
+    timeout = settings.GROUP_DIRECTORY_CACHE_TIMEOUT
+    key = cache.group_directory_key(after, before)
+    cached = default_cache.get(key) if timeout else None
+    if cached is None:
+        cached = fetch_groups(after, before, per_page)
+        if timeout:
+            default_cache.set(key, cached, timeout)
+    groups, has_more = cached
+    if before and not after:
+        next_cursor = groups[-1]['slug'] if groups else None
+        previous_cursor = groups[0]['slug'] if has_more else None
+    else:
+        next_cursor = groups[-1]['slug'] if has_more else None
+        previous_cursor = groups[0]['slug'] if after and groups else None
+    return CursorPage(groups, None, next_cursor, previous_cursor)
@@ -0,0 +1,121 @@
+"""Лента подписок: раскладка постов по ящикам подписчиков.
+
+Пост обычного автора при публикации копируется (fan-out on write) в
+ящики InboxEntry всех подписчиков, и лента читается по индексу ящика.
+Автор, у которого подписчиков стало не меньше
+``settings.FOLLOW_FANOUT_LIMIT``, навсегда помечается
+``fan_out_on_read``: его посты не раскладываются, а подмешиваются в
+ленту при чтении, чтобы один пост не порождал миллионы вставок.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import AuthorStats, Follow, InboxEntry, Post
+from .paginators import CursorPaginator, merge_cursor_pages
+
+
+def fans_out_on_read(author_id):
+    return AuthorStats.objects.filter(
+        author_id=author_id, fan_out_on_read=True
+    ).exists()
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по ящикам подписчиков пачками."""
+    if fans_out_on_read(post.author_id):
+        return
+    batch_size = settings.FOLLOW_FANOUT_BATCH_SIZE
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    batch = []
+    for user_id in follower_ids.iterator(chunk_size=batch_size):
+        batch.append(
+            InboxEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        )
+        if len(batch) == batch_size:
+            InboxEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    InboxEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def follow(user, author):
+    """Подписывает пользователя на автора; False, если уже подписан."""
+    try:
+        with transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+            stats, _ = AuthorStats.objects.get_or_create(author=author)
+            AuthorStats.objects.filter(pk=stats.pk).update(
+                followers_count=F('followers_count') + 1
+            )
+            stats.refresh_from_db()
+            if stats.followers_count >= settings.FOLLOW_FANOUT_LIMIT:
+                if not stats.fan_out_on_read:
+                    AuthorStats.objects.filter(pk=stats.pk).update(
+                        fan_out_on_read=True
+                    )
+                return True
+            # Новый подписчик сразу видит последние посты автора.
+            recent = author.posts.order_by('-pub_date', '-id')[
+                :settings.FOLLOW_BACKFILL_POSTS
+            ].values_list('pk', 'pub_date')
+            InboxEntry.objects.bulk_create(
+                (
+                    InboxEntry(user=user, post_id=pk, pub_date=pub_date)
+                    for pk, pub_date in recent
+                ),
+                ignore_conflicts=True,
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def unfollow(user, author):
+    """Отписывает пользователя от автора; False, если не был подписан."""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(user=user, author=author).delete()
+        if not deleted:
+            return False
+        AuthorStats.objects.filter(author=author).update(
+            followers_count=F('followers_count') - 1
+        )
+        InboxEntry.objects.filter(
+            user=user,
+            post_id__in=author.posts.values('pk'),
+        ).delete()
+    return True
+
+
+def inbox_posts(entries):
+    return [entry.post for entry in entries]
+
+
+def follow_feed_page(user, per_page, after=None, before=None):
+    """Курсорная страница ленты подписок пользователя."""
+    entries = InboxEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    ).order_by('-pub_date', '-post_id')
+    paginators = [CursorPaginator(
+        entries,
+        per_page,
+        cursor_fields=('pub_date', 'post_id'),
+        transform=inbox_posts,
+    )]
+    pulled_authors = list(Follow.objects.filter(
+        user=user, author__stats__fan_out_on_read=True
+    ).values_list('author_id', flat=True))
+    # По запросу на автора: IN по нескольким авторам SQLite не отдаёт
+    # из индекса (author, pub_date) в порядке даты и сортирует все их
+    # посты, а каждый запрос по одному автору читает только страницу.
+    paginators.extend(
+        CursorPaginator(
+            Post.objects.filter(author_id=author_id).select_related(
+                'author', 'group'
+            ).order_by('-pub_date', '-id'),
+            per_page,
+        )
+        for author_id in pulled_authors
+    )
+    return merge_cursor_pages(paginators, after=after, before=before)
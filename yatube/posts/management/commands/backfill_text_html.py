@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post, render_text_html
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет сохранённый HTML текста у постов, где его нет, '
+        'пачками по возрастанию id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько постов обновлять за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Перерендерить и посты, у которых HTML уже есть.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Post.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(text_html='')
+        updated = 0
+        last_pk = 0
+        while True:
+            posts = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk').only(
+                    'pk', 'text'
+                )[:batch_size]
+            )
+            if not posts:
+                break
+            for post in posts:
+                post.text_html = render_text_html(post.text)
+            # bulk_update не вызывает save(): версия постов не меняется.
+            with transaction.atomic():
+                Post.objects.bulk_update(posts, ['text_html'])
+            updated += len(posts)
+            last_pk = posts[-1].pk
+            self.stdout.write(f'Обновлено {updated} постов')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово, обновлено постов: {updated}.'
+        ))
@@ -0,0 +1,96 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт тестовую базу, наполняет её данными и гоняет адреса '
+        'posts и users тестовым клиентом. Печатает JSON с задержками '
+        'p50/p95/p99, числом SQL-запросов и пропускной способностью.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Сколько запросов отправить на каждый адрес.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Сколько потоков одновременно шлют запросы.',
+        )
+        parser.add_argument(
+            '--route',
+            action='append',
+            dest='routes',
+            help='Имя адреса, например posts:index; можно повторять.',
+        )
+        parser.add_argument(
+            '--anonymous',
+            action='store_true',
+            help='Ходить без входа на сайт.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', help='Файл для JSON вместо стандартного вывода.'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError(
+                '--requests и --concurrency должны быть положительными.'
+            )
+        with benchmark.benchmark_database():
+            report = self.run_benchmark(options)
+        benchmark.write_report(self.stdout, report, options['output'])
+
+    def run_benchmark(self, options):
+        author = benchmark.seed(
+            options['users'],
+            options['groups'],
+            options['posts'],
+            random_seed=options['seed'],
+        )
+        user = None if options['anonymous'] else author
+        routes = benchmark.build_routes(author)
+        if options['routes']:
+            unknown = set(options['routes']) - {name for name, *_ in routes}
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные адреса: {", ".join(sorted(unknown))}.'
+                )
+            routes = [
+                route for route in routes if route[0] in options['routes']
+            ]
+        results = []
+        for name, method, address in routes:
+            self.stderr.write(f'{name} {address}')
+            results.append({
+                'route': name,
+                'method': method.upper(),
+                'path': address,
+                **benchmark.run_route(
+                    user,
+                    method,
+                    address,
+                    requests=options['requests'],
+                    concurrency=options['concurrency'],
+                ),
+            })
+        return {
+            'config': {
+                key: options[key]
+                for key in (
+                    'users', 'groups', 'posts', 'requests', 'concurrency',
+                    'anonymous', 'seed',
+                )
+            },
+            'results': results,
+        }
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.models import Post
+from posts.tasks import fan_out_posts
+
+HOURS = 1
+BATCH_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново раскладывает недавние посты по лентам подписчиков. '
+        'Нужна после перезапуска сервера: фоновые задачи раскладки, не '
+        'успевшие выполниться, теряются вместе с процессом. Уже '
+        'разложенные записи не дублируются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=float,
+            default=HOURS,
+            help='За сколько последних часов брать посты.',
+        )
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours'])
+        post_ids = Post.objects.filter(pub_date__gte=since).values_list(
+            'pk', flat=True
+        )
+        batch = []
+        total = 0
+        for post_id in post_ids.iterator():
+            batch.append(post_id)
+            if len(batch) == BATCH_SIZE:
+                fan_out_posts(batch)
+                total += len(batch)
+                batch = []
+        fan_out_posts(batch)
+        total += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Разложено постов: {total}.'
+        ))
@@ -0,0 +1,235 @@
+import csv
+import json
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import cache
+from posts.counters import adjust_post_counts
+from posts.models import Group, Post, User, render_text_html
+
+BATCH_SIZE = 500
+BATCHES_PER_TRANSACTION = 20
+FORMATS = ('jsonl', 'csv')
+
+
+class SkipRow(Exception):
+    pass
+
+
+@contextmanager
+def preserve_pub_date():
+    """Не даёт auto_now_add затереть pub_date из файла при bulk_create."""
+    field = Post._meta.get_field('pub_date')
+    auto_now_add = field.auto_now_add
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = auto_now_add
+
+
+def parse_pub_date(value):
+    """Дата из файла; без часового пояса считается UTC."""
+    if not value:
+        return timezone.now()
+    try:
+        pub_date = parse_datetime(value)
+    except (TypeError, ValueError):
+        pub_date = None
+    if pub_date is None:
+        raise SkipRow(f'неверная дата {value!r}')
+    if timezone.is_naive(pub_date):
+        pub_date = timezone.make_aware(pub_date, timezone.utc)
+    return pub_date
+
+
+class LookupMap:
+    """Отображение естественного ключа в id, подгружаемое пачками.
+
+    В памяти держатся только id уже встречавшихся значений, а в базу
+    уходит один запрос на все новые значения из пачки.
+    """
+
+    def __init__(self, queryset, field):
+        self.queryset = queryset
+        self.field = field
+        self.ids = {}
+
+    def load(self, values):
+        missing = {value for value in values if value not in self.ids}
+        if not missing:
+            return
+        found = dict(
+            self.queryset.filter(**{f'{self.field}__in': missing})
+            .values_list(self.field, 'pk')
+        )
+        for value in missing:
+            self.ids[value] = found.get(value)
+
+    def __getitem__(self, value):
+        return self.ids.get(value)
+
+
+def read_jsonl(stream):
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует посты из JSONL или CSV. Каждая запись '
+        'содержит author (username), text и необязательные group (slug) '
+        'и pub_date (ISO 8601).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл для импорта; «-» — стандартный ввод.'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла; по умолчанию берётся из расширения.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько постов вставлять одним bulk_create.',
+        )
+        parser.add_argument(
+            '--batches-per-transaction',
+            type=int,
+            default=BATCHES_PER_TRANSACTION,
+            help='Сколько пачек фиксировать одной транзакцией.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if file_format not in FORMATS:
+            raise CommandError(
+                'Не удалось определить формат файла, укажите --format.'
+            )
+        self.batch_size = options['batch_size']
+        self.batches_per_transaction = options['batches_per_transaction']
+        self.authors = LookupMap(User.objects.all(), 'username')
+        self.groups = LookupMap(Group.objects.all(), 'slug')
+        self.imported = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+        reader = read_jsonl if file_format == 'jsonl' else read_csv
+        if path == '-':
+            self.run(reader(sys.stdin))
+        else:
+            with open(path, encoding='utf-8', newline='') as stream:
+                self.run(reader(stream))
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано {self.imported}, пропущено {self.skipped} '
+            f'за {elapsed:.1f} с ({self.rate():.0f} строк/с).'
+        ))
+
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.imported / elapsed if elapsed else 0
+
+    def run(self, rows):
+        with preserve_pub_date():
+            batches = []
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == self.batch_size:
+                    batches.append(batch)
+                    batch = []
+                if len(batches) == self.batches_per_transaction:
+                    self.save_chunk(batches)
+                    batches = []
+            if batch:
+                batches.append(batch)
+            if batches:
+                self.save_chunk(batches)
+
+    def save_chunk(self, batches):
+        author_deltas = Counter()
+        group_deltas = Counter()
+        with transaction.atomic():
+            for batch in batches:
+                posts = self.build_posts(batch)
+                Post.objects.bulk_create(posts)
+                for post in posts:
+                    author_deltas[post.author_id] += 1
+                    group_deltas[post.group_id] += 1
+                self.imported += len(posts)
+            adjust_post_counts(author_deltas, group_deltas)
+        scopes = cache.feed_scopes(author_deltas, group_deltas)
+        cache.bump_scope_versions(scopes)
+        cache.invalidate_feed_counts(scopes)
+        self.stdout.write(
+            f'{self.imported} постов, {self.rate():.0f} строк/с'
+        )
+
+    def build_posts(self, batch):
+        rows = [row for row in batch if isinstance(row, dict)]
+        self.authors.load(
+            row['author'] for row in rows
+            if isinstance(row.get('author'), str)
+        )
+        self.groups.load(
+            row['group'] for row in rows
+            if isinstance(row.get('group'), str) and row['group']
+        )
+        posts = []
+        for row in batch:
+            try:
+                posts.append(self.build_post(row))
+            except SkipRow as error:
+                self.skipped += 1
+                self.stderr.write(f'Пропущена запись: {error}')
+        return posts
+
+    def build_post(self, row):
+        if not isinstance(row, dict):
+            raise SkipRow('строка не разобрана')
+        # В JSON поле может оказаться списком или числом; такие строки
+        # пропускаются, а не обрывают импорт вместе с транзакцией.
+        for field in ('author', 'group', 'text'):
+            value = row.get(field)
+            if value is not None and not isinstance(value, str):
+                raise SkipRow(f'{field} не строка: {value!r}')
+        text = row.get('text')
+        if not text:
+            raise SkipRow('нет текста')
+        author_id = self.authors[row.get('author')]
+        if author_id is None:
+            raise SkipRow(f'нет автора {row.get("author")!r}')
+        group_id = None
+        if row.get('group'):
+            group_id = self.groups[row['group']]
+            if group_id is None:
+                raise SkipRow(f'нет группы {row["group"]!r}')
+        return Post(
+            text=text,
+            text_html=render_text_html(text),
+            author_id=author_id,
+            group_id=group_id,
+            pub_date=parse_pub_date(row.get('pub_date')),
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает полнотекстовый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='База данных, в которой перестроить индекс.',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not search.is_available(connection):
+            raise CommandError(
+                'Полнотекстовый индекс поддерживается только на SQLite.'
+            )
+        search.rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS('Индекс постов перестроен.'))
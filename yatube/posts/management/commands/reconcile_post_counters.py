@@ -0,0 +1,115 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import AuthorStats, Group, Post, User
+from posts.paginators import refresh_table_stats
+
+BATCH_SIZE = 1000
+
+
+def batches(queryset, batch_size):
+    """Отдаёт списки id из queryset пачками по возрастанию pk."""
+    last_pk = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', flat=True
+            )[:batch_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет денормализованные счётчики постов авторов и групп '
+        'с таблицей постов и исправляет расхождения, затем обновляет '
+        'статистику, из которой ленты оценивают число постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько авторов или групп сверять за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не меняя.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        fixed_authors = 0
+        for ids in batches(User.objects.all(), batch_size):
+            with transaction.atomic():
+                fixed_authors += self.reconcile_authors(ids, dry_run)
+        fixed_groups = 0
+        for ids in batches(Group.objects.all(), batch_size):
+            with transaction.atomic():
+                fixed_groups += self.reconcile_groups(ids, dry_run)
+        if not dry_run:
+            refresh_table_stats(Post)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: авторов {fixed_authors}, '
+            f'групп {fixed_groups}.'
+        ))
+
+    def reconcile_authors(self, ids, dry_run):
+        actual = dict(
+            Post.objects.filter(author_id__in=ids).values(
+                'author_id'
+            ).annotate(total=Count('id')).order_by().values_list(
+                'author_id', 'total'
+            )
+        )
+        stored = dict(
+            AuthorStats.objects.filter(author_id__in=ids).values_list(
+                'author_id', 'posts_count'
+            )
+        )
+        fixed = 0
+        for author_id in ids:
+            total = actual.get(author_id, 0)
+            if author_id not in stored:
+                if not total:
+                    continue
+                if not dry_run:
+                    AuthorStats.objects.create(
+                        author_id=author_id, posts_count=total
+                    )
+            elif stored[author_id] == total:
+                continue
+            elif not dry_run:
+                AuthorStats.objects.filter(author_id=author_id).update(
+                    posts_count=total
+                )
+            fixed += 1
+        return fixed
+
+    def reconcile_groups(self, ids, dry_run):
+        actual = dict(
+            Post.objects.filter(group_id__in=ids).values(
+                'group_id'
+            ).annotate(total=Count('id')).order_by().values_list(
+                'group_id', 'total'
+            )
+        )
+        stored = Group.objects.filter(pk__in=ids).values_list(
+            'pk', 'posts_count'
+        )
+        fixed = 0
+        for group_id, posts_count in stored:
+            total = actual.get(group_id, 0)
+            if posts_count == total:
+                continue
+            if not dry_run:
+                Group.objects.filter(pk=group_id).update(posts_count=total)
+            fixed += 1
+        return fixed
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.19 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_follow_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='edited_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Версия'),
+        ),
+    ]
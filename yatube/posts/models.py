@@ -1,4 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DEFERRED, F
+from django.template.defaultfilters import linebreaksbr
+from django.utils import timezone
+from django.utils.safestring import mark_safe
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -9,13 +13,24 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.IntegerField(
+        'Количество постов', default=0, editable=False
+    )
 
     def __str__(self) -> str:
         return self.title
 
 
+def render_text_html(text):
+    """Экранированный HTML текста поста с переносами строк."""
+    return str(linebreaksbr(text, autoescape=True))
+
+
 class Post(models.Model):
     text = models.TextField('Текс поста', help_text='Введите текст поста')
+    text_html = models.TextField(
+        'HTML текста', blank=True, default='', editable=False
+    )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
     group = models.ForeignKey(
         Group,
@@ -32,6 +47,188 @@ class Post(models.Model):
         related_name='posts',
         verbose_name='Автор',
     )
+    version = models.PositiveIntegerField(
+        'Версия', default=1, editable=False
+    )
+    edited_at = models.DateTimeField(
+        'Дата изменения', null=True, blank=True, editable=False
+    )
+
+    class Meta:
+        # Индексы под сортировку лент: главная, группа и профиль
+        # читают посты по убыванию pub_date без сортировки в памяти.
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['group', 'pub_date'], name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date'], name='post_author_pub_date_idx'
+            ),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.remember_relations()
 
     def __str__(self) -> str:
         return self.text[:15]
+
+    @property
+    def rendered_text(self):
+        """HTML текста, сохранённый при записи.
+
+        Для постов, которые ещё не прошли backfill_text_html, текст
+        рендерится на лету.
+        """
+        if self.text_html:
+            return mark_safe(self.text_html)
+        return linebreaksbr(self.text, autoescape=True)
+
+    def remember_relations(self):
+        """Запоминает автора, группу и текст, с которыми пост лежит в
+        базе."""
+        self._saved_author_id = self.__dict__.get('author_id', DEFERRED)
+        self._saved_group_id = self.__dict__.get('group_id', DEFERRED)
+        self._saved_text = self.__dict__.get('text', DEFERRED)
+
+    def relations_changed(self):
+        """Сменились ли автор или группа с последнего сохранения."""
+        return any(
+            saved is not DEFERRED and saved != current
+            for saved, current in (
+                (self._saved_author_id, self.author_id),
+                (self._saved_group_id, self.group_id),
+            )
+        )
+
+    def content_changed(self, update_fields=None):
+        """Сменились ли текст, автор или группа, которые сохранение
+        запишет."""
+        if update_fields is not None and not (
+            {'text', 'author', 'author_id', 'group', 'group_id'}
+            & set(update_fields)
+        ):
+            return False
+        text = self.__dict__.get('text', DEFERRED)
+        return self.relations_changed() or (
+            text is not DEFERRED and text != self._saved_text
+        )
+
+    def bump_version(self, using=None):
+        """Увеличивает версию и ставит дату изменения после сохранения.
+
+        Версию увеличивает сама база, чтобы параллельные правки не
+        получили одинаковый номер. В экземпляр попадает уже число, так
+        что обработчики сигналов никогда не видят выражение ``F``.
+        """
+        posts = Post.objects.using(using or self._state.db).filter(
+            pk=self.pk
+        )
+        self.edited_at = timezone.now()
+        posts.update(version=F('version') + 1, edited_at=self.edited_at)
+        self.version = posts.values_list('version', flat=True).get()
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            self.text_html = render_text_html(self.text)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'text_html'}
+        using = kwargs.get('using')
+        bump_version = (
+            not self._state.adding
+            and self.content_changed(kwargs.get('update_fields'))
+        )
+        # Обработчики post_save обновляют счётчики в той же транзакции.
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if bump_version:
+                self.bump_version(using)
+        self.remember_relations()
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора."""
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Автор',
+    )
+    posts_count = models.IntegerField('Количество постов', default=0)
+    followers_count = models.IntegerField('Количество подписчиков', default=0)
+    fan_out_on_read = models.BooleanField(
+        'Лента подписчиков собирается при чтении',
+        default=False,
+        help_text=(
+            'Посты автора не раскладываются по лентам подписчиков, '
+            'а подмешиваются в них при чтении.'
+        ),
+    )
+
+    def __str__(self) -> str:
+        return f'{self.author_id}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['author', 'user'], name='follow_author_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.user_id} -> {self.author_id}'
+
+
+class InboxEntry(models.Model):
+    """Пост в заранее собранной ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='inbox',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='inbox_entries',
+        verbose_name='Пост',
+    )
+    # Копия Post.pub_date: лента читается по индексу этой таблицы.
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_inbox_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'], name='inbox_feed_idx'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.user_id}: {self.post_id}'
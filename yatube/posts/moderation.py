@@ -0,0 +1,107 @@
+"""Массовые перенос и удаление постов пачками.
+
+Каждая пачка меняется одним ``UPDATE`` или ``DELETE`` в своей
+транзакции, без загрузки моделей и без сигналов. Поэтому всё, что
+обычно делают обработчики из ``signals.py``, здесь выполняется явно:
+счётчики сдвигаются в той же транзакции, а версии страниц и число
+постов лент сбрасываются после неё. Карточки постов сбрасывать не
+нужно: перенос поднимает версию поста, а удалённый пост лента больше
+не покажет.
+"""
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cache
+from .counters import adjust_post_counts
+from .models import InboxEntry, Post
+
+logger = logging.getLogger(__name__)
+
+
+def chunks(queryset, chunk_size=None):
+    """Списки ``(pk, author_id, group_id)`` постов пачками по pk."""
+    chunk_size = chunk_size or settings.POSTS_MODERATION_CHUNK_SIZE
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', 'author_id', 'group_id'
+            )[:chunk_size]
+        )
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1][0]
+
+
+def invalidate(author_ids, group_ids):
+    scopes = cache.feed_scopes(author_ids=author_ids, group_ids=group_ids)
+    cache.bump_scope_versions(scopes)
+    cache.invalidate_feed_counts(scopes)
+
+
+def move_posts(queryset, group, chunk_size=None, progress=None):
+    """Переносит посты из queryset в группу ``group`` (или без группы).
+
+    ``progress(done)`` вызывается после каждой пачки. Возвращает число
+    перенесённых постов.
+    """
+    group_id = group.pk if group is not None else None
+    moved = 0
+    for rows in chunks(queryset.exclude(group_id=group_id), chunk_size):
+        post_ids = [pk for pk, _, _ in rows]
+        group_deltas = Counter(group for _, _, group in rows)
+        for old_group_id in group_deltas:
+            group_deltas[old_group_id] = -group_deltas[old_group_id]
+        group_deltas[group_id] += len(rows)
+        with transaction.atomic():
+            Post.objects.filter(pk__in=post_ids).update(
+                group_id=group_id,
+                version=F('version') + 1,
+                edited_at=timezone.now(),
+            )
+            adjust_post_counts({}, group_deltas)
+        invalidate(
+            author_ids={author for _, author, _ in rows},
+            group_ids=group_deltas,
+        )
+        moved += len(rows)
+        logger.info('Перенесено постов: %s', moved)
+        if progress is not None:
+            progress(moved)
+    return moved
+
+
+def delete_posts(queryset, chunk_size=None, progress=None):
+    """Удаляет посты из queryset вместе с записями лент подписок.
+
+    ``progress(done)`` вызывается после каждой пачки. Возвращает число
+    удалённых постов.
+    """
+    deleted = 0
+    for rows in chunks(queryset, chunk_size):
+        post_ids = [pk for pk, _, _ in rows]
+        author_deltas = Counter(author for _, author, _ in rows)
+        group_deltas = Counter(group for _, _, group in rows)
+        with transaction.atomic():
+            # Записи лент ссылаются на посты и удаляются первыми:
+            # _raw_delete, в отличие от delete(), не обходит связи и
+            # не шлёт сигналы на каждую строку.
+            InboxEntry.objects.filter(post_id__in=post_ids).delete()
+            posts = Post.objects.filter(pk__in=post_ids)
+            posts._raw_delete(posts.db)
+            adjust_post_counts(
+                {author: -count for author, count in author_deltas.items()},
+                {group: -count for group, count in group_deltas.items()},
+            )
+        invalidate(author_deltas, group_deltas)
+        deleted += len(rows)
+        logger.info('Удалено постов: %s', deleted)
+        if progress is not None:
+            progress(deleted)
+    return deleted
@@ -0,0 +1,347 @@
+import base64
+import collections.abc
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+CURSOR_SEPARATOR = '|'
+
+
+def encode_cursor(post):
+    """Упаковывает позицию поста (pub_date, id) в непрозрачный токен."""
+    raw = f'{post.pub_date.isoformat()}{CURSOR_SEPARATOR}{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (pub_date, id) из токена или None, если токен битый."""
+    if not token:
+        return None
+    padding = '=' * (-len(token) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+        pub_date, pk = raw.rsplit(CURSOR_SEPARATOR, 1)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(pub_date, datetime):
+        return None
+    return pub_date, pk
+
+
+class CursorPage(collections.abc.Sequence):
+    """Страница ленты, построенная по курсору.
+
+    Не знает ни своего номера, ни общего числа страниц, поэтому это не
+    ``Page``: у неё есть только записи, курсоры соседних страниц и
+    проверки ``has_next``/``has_previous``. Шаблоны отличают её по
+    ``is_cursor``.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class NumberedPage(Page):
+    """Нумерованная страница ленты, знающая курсоры соседних страниц.
+
+    Навигация ведёт «вперёд» и «назад» по курсорам, так что переход по
+    ссылкам не уходит вглубь ``OFFSET``; номера остаются только у
+    страниц вокруг текущей.
+    """
+
+    @cached_property
+    def next_cursor(self):
+        if not self.has_next() or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[-1])
+
+    @cached_property
+    def previous_cursor(self):
+        if not self.has_previous() or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[0])
+
+
+def estimate_table_rows(model, using='default'):
+    """Примерное число строк таблицы модели из статистики ANALYZE.
+
+    Статистику сама SQLite не обновляет: её освежает
+    ``refresh_table_stats``, которую вызывает команда
+    ``reconcile_post_counters``. Возвращает None, если статистики нет
+    или база не SQLite.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                [model._meta.db_table],
+            )
+        except DatabaseError:
+            # Таблица sqlite_stat1 появляется после первого ANALYZE.
+            return None
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return int(row[0].split()[0])
+
+
+def refresh_table_stats(model, using='default'):
+    """Пересобирает статистику ANALYZE для таблицы модели.
+
+    ``analysis_limit`` ограничивает число просматриваемых строк индекса,
+    так что на большой таблице это не полный проход.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA analysis_limit = 1000')
+        cursor.execute(
+            f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}'
+        )
+
+
+class CursorPaginator(Paginator):
+    """Paginator для лент, отсортированных по ``(-pub_date, -id)``.
+
+    Без параметров ``after``/``before`` работает как обычный Paginator
+    с номерами страниц. С ними строит страницу по ключу, используя
+    условие по ``(pub_date, id)`` вместо ``OFFSET`` и без подсчёта
+    общего числа записей. Если записи ленты — не посты, а строки,
+    указывающие на них, ``cursor_fields`` называет поля ключа в
+    queryset, а ``transform`` превращает прочитанные строки в посты.
+
+    Число записей для номеров страниц берётся из кеша по
+    ``count_cache_key``, затем из оценки ``estimate()``, если она не
+    меньше ``settings.POSTS_ESTIMATED_COUNT_THRESHOLD``, и только потом
+    из ``COUNT(*)``. Результат кладётся в кеш на
+    ``settings.POSTS_COUNT_CACHE_TIMEOUT`` секунд.
+    """
+
+    def __init__(self, object_list, per_page, count_cache_key=None,
+                 estimate=None, cursor_fields=('pub_date', 'pk'),
+                 transform=list, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_cache_key = count_cache_key
+        self.estimate = estimate
+        self.cursor_fields = cursor_fields
+        self.transform = transform
+
+    @cached_property
+    def count(self):
+        if self.count_cache_key is not None:
+            count = cache.get(self.count_cache_key)
+            if count is not None:
+                return count
+        count = None
+        if self.estimate is not None:
+            estimated = self.estimate()
+            if (
+                estimated is not None
+                and estimated >= settings.POSTS_ESTIMATED_COUNT_THRESHOLD
+            ):
+                count = estimated
+        if count is None:
+            count = super().count
+        if self.count_cache_key is not None:
+            cache.set(
+                self.count_cache_key,
+                count,
+                settings.POSTS_COUNT_CACHE_TIMEOUT,
+            )
+        return count
+
+    def page(self, number):
+        # Число записей может быть оценкой или устареть в кеше, поэтому
+        # срез страницы не обрезаем по нему.
+        number = self.validate_number(number)
+        object_list = self.slice(number)
+        if not object_list and number > 1:
+            # Число завышено, и страница оказалась за концом ленты:
+            # считаем записи точно и отдаём настоящую последнюю.
+            self.recount()
+            number = self.num_pages
+            object_list = self.slice(number)
+        return self._get_page(object_list, number, self)
+
+    def _get_page(self, *args, **kwargs):
+        return NumberedPage(*args, **kwargs)
+
+    def slice(self, number):
+        bottom = (number - 1) * self.per_page
+        return list(self.object_list[bottom:bottom + self.per_page])
+
+    def recount(self):
+        """Заменяет оценку или закешированное число на COUNT(*)."""
+        self.estimate = None
+        if self.count_cache_key is not None:
+            cache.delete(self.count_cache_key)
+        self.__dict__.pop('count', None)
+        self.__dict__.pop('num_pages', None)
+
+    def fetch(self, after_key=None, before_key=None):
+        """Читает до ``per_page + 1`` записей после или до ключа.
+
+        Возвращает записи, пропущенные через ``transform``, по убыванию
+        ключа, и признак того, что в этом направлении есть ещё.
+        """
+        date_field, id_field = self.cursor_fields
+        queryset = self.object_list
+        if after_key is not None:
+            pub_date, pk = after_key
+            queryset = queryset.filter(
+                Q(**{f'{date_field}__lt': pub_date})
+                | Q(**{date_field: pub_date, f'{id_field}__lt': pk})
+            )
+        elif before_key is not None:
+            pub_date, pk = before_key
+            queryset = queryset.filter(
+                Q(**{f'{date_field}__gt': pub_date})
+                | Q(**{date_field: pub_date, f'{id_field}__gt': pk})
+            ).reverse()
+        objects = list(queryset[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        if after_key is None and before_key is not None:
+            objects.reverse()
+        objects = self.transform(objects)
+        return objects, has_more
+
+    def get_cursor_page(self, after=None, before=None):
+        after_key = decode_cursor(after)
+        before_key = None if after_key else decode_cursor(before)
+        objects, has_more = self.fetch(after_key, before_key)
+        return build_cursor_page(
+            objects, self, has_more, after_key, before_key
+        )
+
+
+class EstimatedCountPaginator(CursorPaginator):
+    """Paginator для списков админки на больших таблицах.
+
+    Без фильтров и поиска число записей берётся из статистики ANALYZE
+    по тем же правилам, что в CursorPaginator; с ними — из COUNT(*),
+    который ограничен условием и идёт по индексу.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True):
+        estimate = None
+        if not object_list.query.has_filters():
+            def estimate():
+                return estimate_table_rows(
+                    object_list.model, object_list.db
+                )
+        super().__init__(
+            object_list,
+            per_page,
+            estimate=estimate,
+            orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+        )
+
+
+def build_cursor_page(objects, paginator, has_more, after_key, before_key):
+    """Собирает CursorPage из записей, прочитанных в одном направлении.
+
+    ``objects`` отсортированы по убыванию ключа и могут быть длиннее
+    страницы на одну запись.
+    """
+    per_page = paginator.per_page
+    if before_key is not None:
+        # Листали к новым записям: лишняя запись — самая новая.
+        objects = objects[-per_page:]
+        return CursorPage(
+            objects,
+            paginator,
+            next_cursor=encode_cursor(objects[-1]) if objects else None,
+            previous_cursor=(
+                encode_cursor(objects[0]) if has_more else None
+            ),
+        )
+    objects = objects[:per_page]
+    return CursorPage(
+        objects,
+        paginator,
+        next_cursor=encode_cursor(objects[-1]) if has_more else None,
+        previous_cursor=(
+            encode_cursor(objects[0])
+            if after_key is not None and objects else None
+        ),
+    )
+
+
+def merge_cursor_pages(paginators, after=None, before=None):
+    """Курсорная страница из нескольких источников одной ленты.
+
+    Каждый источник читается по своему индексу, результаты сливаются
+    по ``(pub_date, pk)``; повторы одной записи убираются.
+    """
+    after_key = decode_cursor(after)
+    before_key = None if after_key else decode_cursor(before)
+    merged = {}
+    has_more = False
+    per_page = paginators[0].per_page
+    for paginator in paginators:
+        objects, source_has_more = paginator.fetch(after_key, before_key)
+        has_more = has_more or source_has_more
+        for obj in objects:
+            merged[obj.pk] = obj
+    objects = sorted(
+        merged.values(), key=lambda obj: (obj.pub_date, obj.pk), reverse=True
+    )
+    if len(objects) > per_page:
+        has_more = True
+    return build_cursor_page(
+        objects, paginators[0], has_more, after_key, before_key
+    )
+
+
+def paginate(request, queryset, per_page, **paginator_kwargs):
+    """Возвращает page_obj для ленты по параметрам запроса.
+
+    ``?after=``/``?before=`` включают курсорный режим, ``?page=``
+    оставляет привычную постраничную навигацию. Остальные аргументы
+    уходят в CursorPaginator.
+    """
+    paginator = CursorPaginator(queryset, per_page, **paginator_kwargs)
+    if 'after' in request.GET or 'before' in request.GET:
+        return paginator.get_cursor_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    return paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,141 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс ``posts_post_fts`` хранит только токены: текст он читает из
+``posts_post`` по rowid (external content). В актуальном состоянии его
+держат триггеры на вставку, изменение и удаление постов, поэтому в
+индекс попадают и массовые операции мимо ORM-сигналов.
+"""
+from django.db import connection as default_connection
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'posts_post_fts'
+
+CREATE_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "text, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+CREATE_TRIGGERS_SQL = (
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+)
+DROP_SQL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+OPTIMIZE_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+
+
+def is_available(connection=default_connection):
+    return connection.vendor == 'sqlite'
+
+
+def create_search_index(connection=default_connection):
+    """Создаёт индекс и триггеры и наполняет индекс текущими постами."""
+    if not is_available(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE_SQL)
+        for sql in CREATE_TRIGGERS_SQL:
+            cursor.execute(sql)
+        cursor.execute(REBUILD_SQL)
+
+
+def drop_search_index(connection=default_connection):
+    if not is_available(connection):
+        return
+    with connection.cursor() as cursor:
+        for sql in DROP_SQL:
+            cursor.execute(sql)
+
+
+def ensure_triggers(connection=default_connection):
+    """Восстанавливает триггеры, если миграция пересоздала posts_post.
+
+    SQLite-бэкенд Django меняет схему через копию таблицы, и триггеры
+    старой таблицы при этом пропадают. Rowid постов сохраняются, так
+    что сам индекс остаётся верным.
+    """
+    if not is_available(connection):
+        return
+    tables = connection.introspection.table_names()
+    if FTS_TABLE not in tables or 'posts_post' not in tables:
+        return
+    with connection.cursor() as cursor:
+        for sql in CREATE_TRIGGERS_SQL:
+            cursor.execute(sql)
+
+
+def rebuild_search_index(connection=default_connection):
+    """Перестраивает индекс целиком по таблице постов."""
+    if not is_available(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE_SQL)
+        for sql in CREATE_TRIGGERS_SQL:
+            cursor.execute(sql)
+        cursor.execute(REBUILD_SQL)
+        cursor.execute(OPTIMIZE_SQL)
+
+
+def build_match_query(search_term):
+    """Превращает ввод пользователя в запрос FTS5 из фраз через AND.
+
+    Каждое слово берётся в кавычки, так что операторы и спецсимволы
+    FTS5 из ввода не интерпретируются.
+    """
+    words = search_term.split()
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def filter_posts(queryset, search_term):
+    """Оставляет в queryset посты, подходящие под запрос.
+
+    Порядок queryset не меняется; без FTS5 работает через LIKE.
+    """
+    match = build_match_query(search_term)
+    if not match:
+        return queryset.none()
+    if not is_available():
+        return queryset.filter(text__icontains=search_term.strip())
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (match,),
+    ))
+
+
+def search_posts(queryset, search_term):
+    """Посты из queryset, подходящие под запрос, по убыванию
+    релевантности (bm25)."""
+    match = build_match_query(search_term)
+    if not match:
+        return queryset.none()
+    if not is_available():
+        return queryset.filter(
+            text__icontains=search_term.strip()
+        ).order_by('-pub_date', '-id')
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = posts_post.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[match],
+        order_by=[f'{FTS_TABLE}.rank', '-pub_date'],
+    )
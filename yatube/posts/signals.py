@@ -0,0 +1,108 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.tasks import after_commit, defer
+
+from . import cache, counters, tasks
+from .models import Group, Post, User
+
+# Поля, которые попадают в закешированную карточку поста.
+AUTHOR_CARD_FIELDS = {'first_name', 'last_name'}
+GROUP_CARD_FIELDS = {'slug'}
+# Поля группы, которые видны на странице группы и в каталоге групп.
+GROUP_PAGE_FIELDS = {'title', 'slug', 'description'}
+
+
+def touches(update_fields, fields):
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+def invalidate_after_commit(posts=(), scopes=(), count_scopes=(),
+                            directory=False):
+    """Сбрасывает кеш после фиксации записи.
+
+    Сброс внутри транзакции дал бы параллельному читателю закешировать
+    ещё старую страницу под новой версией.
+    """
+    posts = list(posts)
+    scopes = list(scopes)
+    count_scopes = list(count_scopes)
+
+    def invalidate():
+        cache.invalidate_post_fragments(posts)
+        cache.bump_scope_versions(scopes)
+        cache.invalidate_feed_counts(count_scopes)
+        if directory:
+            cache.invalidate_group_directory()
+
+    after_commit(invalidate)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    counters.post_saved(instance, created)
+    scopes = cache.feed_scopes(
+        author_ids=(instance.author_id, instance._saved_author_id),
+        group_ids=(instance.group_id, instance._saved_group_id),
+    )
+    invalidate_after_commit(
+        # Правка содержания поднимает версию и сама уводит ленты на
+        # новую карточку; текущую сбрасываем ради остальных полей.
+        posts=((instance.pk, instance.version),),
+        scopes=scopes,
+        count_scopes=(
+            scopes if created or instance.relations_changed() else ()
+        ),
+    )
+    if created:
+        # Раскладка по лентам подписчиков растёт с их числом и идёт в
+        # фоне после фиксации поста.
+        defer(tasks.fan_out_posts, instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.post_deleted(instance)
+    scopes = cache.feed_scopes(
+        author_ids=(instance.author_id,), group_ids=(instance.group_id,)
+    )
+    # Карточку удалённого поста ни одна лента больше не покажет.
+    invalidate_after_commit(scopes=scopes, count_scopes=scopes)
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or not touches(update_fields, AUTHOR_CARD_FIELDS):
+        return
+    posts = instance.posts.all()
+    invalidate_after_commit(
+        posts=posts.values_list('pk', 'version').iterator(),
+        scopes=cache.feed_scopes(
+            author_ids=(instance.pk,),
+            group_ids=posts.values_list('group_id', flat=True).distinct(),
+        ),
+    )
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        invalidate_after_commit(directory=True)
+        return
+    posts = ()
+    scopes = []
+    if touches(update_fields, GROUP_CARD_FIELDS):
+        posts = instance.posts.values_list('pk', 'version').iterator()
+        scopes.append(cache.GLOBAL_SCOPE)
+    if touches(update_fields, GROUP_PAGE_FIELDS):
+        scopes.extend(
+            (cache.group_scope(instance.slug), cache.DIRECTORY_SCOPE)
+        )
+    invalidate_after_commit(posts=posts, scopes=scopes)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_after_commit(directory=True)
@@ -0,0 +1,12 @@
+"""Фоновые задачи приложения posts (см. ``core.tasks``)."""
+from . import inbox
+from .models import Post
+
+
+def fan_out_posts(post_ids):
+    """Раскладывает новые посты по лентам подписчиков.
+
+    Посты, удалённые до запуска задачи, пропускаются.
+    """
+    for post in Post.objects.filter(pk__in=set(post_ids)).order_by('pk'):
+        inbox.fan_out_post(post)
@@ -0,0 +1,191 @@
+import re
+from urllib.parse import urlencode
+
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import query_budget
+from posts.inbox import follow
+from posts.models import AuthorStats, Group, InboxEntry, Post, User
+
+TEST_POSTS = 30
+
+
+class PostAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for number in range(TEST_POSTS):
+            Post.objects.create(
+                author=User.objects.create_user(username=f'user{number}'),
+                group=cls.group,
+                text=f'Тестовый пост {number}',
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.changelist = reverse('admin:posts_post_changelist')
+
+    def test_changelist_fits_query_budget(self):
+        """Список постов не ходит за автором и группой на каждую строку
+        и не считает таблицу дважды."""
+        # Сессия, пользователь, оценка из статистики, число постов,
+        # страница постов.
+        with query_budget(5):
+            response = self.client.get(self.changelist)
+        self.assertContains(response, 'Тестовый пост 0')
+
+    @override_settings(POSTS_ESTIMATED_COUNT_THRESHOLD=1)
+    def test_changelist_uses_estimated_count(self):
+        """Без фильтров число постов берётся из статистики ANALYZE."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.changelist)
+        self.assertEqual(response.context['cl'].result_count, TEST_POSTS)
+        self.assertFalse(
+            any('COUNT(*)' in query['sql'] for query in queries)
+        )
+
+    def test_change_form_has_no_full_selects(self):
+        """Форма поста не выводит всех авторов списком."""
+        post = Post.objects.first()
+        response = self.client.get(
+            reverse('admin:posts_post_change', args=(post.pk,))
+        )
+        self.assertNotContains(response, 'user29</option>')
+
+
+@override_settings(POSTS_MODERATION_CHUNK_SIZE=2)
+class PostAdminActionsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Другое описание',
+        )
+        follow(cls.follower, cls.author)
+        for number in range(5):
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text=f'Тестовый пост {number}',
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.changelist = reverse('admin:posts_post_changelist')
+
+    def run_action(self, action, posts, **data):
+        return self.client.post(self.changelist, {
+            'action': action,
+            ACTION_CHECKBOX_NAME: [post.pk for post in posts],
+            **data,
+        })
+
+    def test_move_posts_updates_groups_and_counters(self):
+        """Перенос меняет группу, версию поста и счётчики обеих групп."""
+        posts = list(Post.objects.order_by('pk')[:3])
+        self.run_action('move_posts', posts, group_slug='other_slug')
+        for post in posts:
+            moved = Post.objects.get(pk=post.pk)
+            self.assertEqual(moved.group, self.other_group)
+            self.assertEqual(moved.version, post.version + 1)
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 2)
+        self.assertEqual(self.other_group.posts_count, 3)
+
+    def test_move_posts_to_unknown_group(self):
+        """Перенос в несуществующую группу ничего не меняет."""
+        self.run_action(
+            'move_posts', Post.objects.all(), group_slug='missing'
+        )
+        self.assertEqual(
+            Post.objects.filter(group=self.group).count(), 5
+        )
+
+    def test_delete_posts_asks_for_confirmation(self):
+        """Без подтверждения посты не удаляются."""
+        response = self.run_action('delete_posts', Post.objects.all())
+        self.assertTemplateUsed(
+            response, 'admin/posts/post/delete_posts_confirmation.html'
+        )
+        self.assertEqual(response.context['count'], 5)
+        self.assertEqual(Post.objects.count(), 5)
+
+    def test_delete_posts_updates_inbox_and_counters(self):
+        """Удаление убирает посты из лент и уменьшает счётчики."""
+        posts = list(Post.objects.order_by('pk')[:3])
+        self.run_action('delete_posts', posts, post='yes')
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            InboxEntry.objects.filter(user=self.follower).count(), 2
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 2)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).posts_count, 2
+        )
+
+    def test_delete_across_filtered_selection(self):
+        """Подтверждение «выбрать все» удаляет все найденные посты и
+        только их."""
+        kept = Post.objects.create(
+            author=self.follower, text='Другая запись'
+        )
+        address = self.changelist + '?' + urlencode({'q': 'Тестовый'})
+        response = self.client.post(address, {
+            'action': 'delete_posts',
+            'select_across': '1',
+            'index': '0',
+            ACTION_CHECKBOX_NAME: [Post.objects.exclude(pk=kept.pk)[0].pk],
+        })
+        content = response.content.decode()
+        form_action = re.search(r'<form action="([^"]*)"', content)[1]
+        self.assertEqual(form_action, address)
+        data = {}
+        for name, value in re.findall(
+            r'<input type="hidden" name="([^"]+)" value="([^"]*)"', content
+        ):
+            data.setdefault(name, []).append(value)
+        self.assertEqual(data['select_across'], ['1'])
+        response = self.client.post(form_action, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(Post.objects.all()), [kept])
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_default_delete_selected_is_replaced(self):
+        """Постовое удаление Django заменено пачечным."""
+        response = self.client.get(self.changelist)
+        actions = dict(response.context['action_form'].fields[
+            'action'
+        ].choices)
+        self.assertNotIn('delete_selected', actions)
+        self.assertIn('delete_posts', actions)
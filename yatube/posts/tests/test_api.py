@@ -0,0 +1,110 @@
+import time
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from posts.models import Group, Post, User
+
+TEST_POSTS = 13
+
+
+class FeedApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Byblik')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for number in range(TEST_POSTS):
+            Post.objects.create(
+                author=cls.user,
+                group=cls.group,
+                text=f'Тестовый пост {number}',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.feeds = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group_lists', kwargs={'slug': 'test_slug'}),
+            reverse('posts:api_profile', kwargs={'username': 'Byblik'}),
+        )
+
+    def test_feeds_paginate_by_cursor(self):
+        """Ленты отдают посты страницами по курсору."""
+        for address in self.feeds:
+            with self.subTest(address=address):
+                first = self.client.get(address).json()
+                self.assertEqual(len(first['results']), 10)
+                self.assertEqual(
+                    first['results'][0]['text'], 'Тестовый пост 12'
+                )
+                self.assertIsNone(first['previous'])
+                second = self.client.get(
+                    address, {'after': first['next']}
+                ).json()
+                self.assertEqual(len(second['results']), TEST_POSTS - 10)
+                self.assertIsNone(second['next'])
+
+    def test_unchanged_feed_not_modified(self):
+        """Неизменившаяся лента отвечает 304 по ETag."""
+        for address in self.feeds:
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertEqual(
+                    self.client.get(
+                        address, HTTP_IF_NONE_MATCH=response['ETag']
+                    ).status_code,
+                    HTTPStatus.NOT_MODIFIED,
+                )
+
+    def test_edit_not_hidden_by_if_modified_since(self):
+        """После правки старого поста запрос с If-Modified-Since
+        получает свежую ленту."""
+        since = http_date(time.time() + 60)
+        post = Post.objects.earliest('pub_date')
+        post.text = 'Исправленный текст'
+        post.save()
+        for address in self.feeds:
+            with self.subTest(address=address):
+                after = self.client.get(address).json()['next']
+                response = self.client.get(
+                    address, {'after': after}, HTTP_IF_MODIFIED_SINCE=since
+                )
+                self.assertFalse(response.has_header('Last-Modified'))
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(
+                    response.json()['results'][-1]['text'],
+                    'Исправленный текст',
+                )
+
+    def test_edit_changes_etag(self):
+        """Правка поста меняет ETag лент, где он виден."""
+        etags = [self.client.get(address)['ETag'] for address in self.feeds]
+        post = Post.objects.latest('pub_date')
+        post.text = 'Исправленный текст'
+        post.save()
+        for address, etag in zip(self.feeds, etags):
+            with self.subTest(address=address):
+                response = self.client.get(
+                    address, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(
+                    response.json()['results'][0]['text'],
+                    'Исправленный текст',
+                )
+
+    def test_unknown_group_not_found(self):
+        """Лента несуществующей группы отвечает 404."""
+        response = self.client.get(
+            reverse('posts:api_group_lists', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts import benchmark
+from posts.models import AuthorStats, Post
+
+
+class BenchmarkTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_percentile(self):
+        """Перцентиль считается по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+        self.assertIsNone(benchmark.percentile([], 50))
+
+    def test_seed_and_run_every_route(self):
+        """Прогон проходит по всем адресам без ошибок сервера."""
+        author = benchmark.seed(users=5, groups=2, posts=30)
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(
+            AuthorStats.objects.get(author=author).posts_count,
+            author.posts.count(),
+        )
+        for name, method, address in benchmark.build_routes(author):
+            with self.subTest(name=name):
+                result = benchmark.run_route(
+                    author, method, address, requests=2
+                )
+                self.assertEqual(result['requests'], 2)
+                self.assertTrue(
+                    all(int(status) < 500 for status in result['statuses'])
+                )
+                self.assertIn('p99', result['latency_ms'])
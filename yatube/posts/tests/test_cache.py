@@ -0,0 +1,265 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+from posts.models import Group, Post, User
+
+
+class PostFragmentCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='Byblik', first_name='Старое'
+        )
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text='Исходный текст'
+        )
+        self.feeds = (
+            reverse('posts:index'),
+            reverse('posts:group_lists', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'Byblik'}),
+        )
+
+    def warm_feeds(self):
+        for address in self.feeds:
+            self.authorized_client.get(address)
+
+    def test_feeds_reuse_cached_cards(self):
+        """Карточка поста берётся из кеша, пока пост не сохраняли."""
+        self.warm_feeds()
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        for address in self.feeds:
+            with self.subTest(address=address):
+                response = self.authorized_client.get(address)
+                self.assertContains(response, 'Исходный текст')
+
+    def test_post_edit_invalidates_cards(self):
+        """После post_edit ленты показывают новый текст."""
+        self.warm_feeds()
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': 'Новый текст', 'group': self.group.id},
+        )
+        for address in self.feeds:
+            with self.subTest(address=address):
+                response = self.authorized_client.get(address)
+                self.assertContains(response, 'Новый текст')
+                self.assertNotContains(response, 'Исходный текст')
+
+    def test_author_rename_invalidates_cards(self):
+        """Смена имени автора сбрасывает карточки его постов."""
+        self.warm_feeds()
+        self.user.first_name = 'Новое'
+        self.user.save()
+        for address in self.feeds:
+            with self.subTest(address=address):
+                response = self.authorized_client.get(address)
+                self.assertContains(response, 'Новое')
+
+    def test_card_keyed_on_post_version(self):
+        """Карточка во всех лентах, включая подписки и поиск, привязана к
+        версии поста: новая версия показывается без сброса кеша."""
+        reader = User.objects.create_user(username='reader')
+        reader_client = Client()
+        reader_client.force_login(reader)
+        reader_client.post(
+            reverse('posts:profile_follow', kwargs={'username': 'Byblik'})
+        )
+        addresses = self.feeds + (
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=текст',
+        )
+        for address in addresses:
+            reader_client.get(address)
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Новый текст',
+            text_html='Новый текст',
+            version=F('version') + 1,
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                response = reader_client.get(address)
+                self.assertContains(response, 'Новый текст')
+                self.assertNotContains(response, 'Исходный текст')
+
+
+class AnonymousPageCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = User.objects.create_user(username='Byblik')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        self.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Другое описание',
+        )
+        self.index = reverse('posts:index')
+        self.group_page = reverse(
+            'posts:group_lists', kwargs={'slug': 'test_slug'}
+        )
+        self.other_group_page = reverse(
+            'posts:group_lists', kwargs={'slug': 'other_slug'}
+        )
+
+    def test_anonymous_page_served_from_cache(self):
+        """Повторный анонимный запрос не ходит в базу."""
+        self.guest_client.get(self.index)
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(self.index)
+        self.assertEqual(response.status_code, 200)
+
+    def test_authorized_page_not_cached(self):
+        """Авторизованный пользователь всегда получает свежую страницу."""
+        self.authorized_client.get(self.index)
+        response = self.authorized_client.get(self.index)
+        self.assertIsNotNone(response.context)
+
+    def test_new_post_invalidates_only_its_scopes(self):
+        """Новый пост сбрасывает главную и свою группу, но не чужую."""
+        for address in (self.index, self.group_page, self.other_group_page):
+            self.guest_client.get(address)
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Свежий пост', 'group': self.group.id},
+        )
+        for address in (self.index, self.group_page):
+            with self.subTest(address=address):
+                response = self.guest_client.get(address)
+                self.assertContains(response, 'Свежий пост')
+        with self.assertNumQueries(0):
+            self.guest_client.get(self.other_group_page)
+
+    @override_settings(TASKS_EAGER=False)
+    def test_invalidation_waits_for_commit(self):
+        """Кеш сбрасывается после фиксации транзакции, а не внутри неё:
+        иначе параллельный запрос закеширует страницу без поста."""
+        self.guest_client.get(self.index)
+        with capture_on_commit_callbacks() as callbacks:
+            Post.objects.create(author=self.user, text='Свежий пост')
+            with self.assertNumQueries(0):
+                self.guest_client.get(self.index)
+        inline_queue = SimpleNamespace(
+            submit=lambda task, items: task(list(items))
+        )
+        with mock.patch('core.tasks.get_queue', return_value=inline_queue):
+            for callback in callbacks:
+                callback()
+        response = self.guest_client.get(self.index)
+        self.assertContains(response, 'Свежий пост')
+
+    @override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+    def test_zero_timeout_disables_cache(self):
+        """POSTS_PAGE_CACHE_TIMEOUT = 0 выключает кеш страниц."""
+        self.guest_client.get(self.index)
+        response = self.guest_client.get(self.index)
+        self.assertIsNotNone(response.context)
+
+
+class FeedCountCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Byblik')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=self.user, group=self.group, text=f'Пост {number}')
+            for number in range(13)
+        )
+        self.feeds = (
+            reverse('posts:index'),
+            reverse('posts:group_lists', kwargs={'slug': 'test_slug'}),
+            reverse('posts:profile', kwargs={'username': 'Byblik'}),
+        )
+
+    def count_queries(self, address):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(address)
+        counts = [
+            query for query in queries.captured_queries
+            if 'COUNT(' in query['sql'].upper()
+        ]
+        return response, counts
+
+    def test_count_taken_from_cache(self):
+        """Повторный показ ленты не выполняет COUNT(*)."""
+        for address in self.feeds:
+            with self.subTest(address=address):
+                self.count_queries(address)
+                response, counts = self.count_queries(address)
+                self.assertEqual(counts, [])
+                self.assertEqual(
+                    response.context['page_obj'].paginator.count, 13
+                )
+
+    def test_new_post_invalidates_count(self):
+        """Новый пост сбрасывает закешированные числа его лент."""
+        for address in self.feeds:
+            self.count_queries(address)
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Ещё пост', 'group': self.group.id},
+        )
+        for address in self.feeds:
+            with self.subTest(address=address):
+                response, counts = self.count_queries(address)
+                self.assertEqual(len(counts), 1)
+                self.assertEqual(
+                    response.context['page_obj'].paginator.count, 14
+                )
+
+    @override_settings(POSTS_ESTIMATED_COUNT_THRESHOLD=10)
+    def test_large_feed_uses_estimate(self):
+        """Большая главная берёт число постов из статистики ANALYZE."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        response, counts = self.count_queries(reverse('posts:index'))
+        self.assertEqual(counts, [])
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+
+    @override_settings(POSTS_ESTIMATED_COUNT_THRESHOLD=10)
+    def test_page_past_stale_estimate_clamped(self):
+        """Если устаревшая статистика завышает число постов, страница за
+        концом ленты становится настоящей последней."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Удалённый пост {number}')
+            for number in range(20)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.filter(text__startswith='Удалённый').delete()
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'page': 4}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj), 3)
+        self.assertEqual(page_obj.paginator.count, 13)
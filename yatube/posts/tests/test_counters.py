@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import AuthorStats, Group, Post, User
+from posts.paginators import estimate_table_rows
+
+
+class PostCountersTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='Byblik')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        self.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Тестовое описание',
+        )
+
+    def assertCounts(self, author_count, group_count, other_group_count):
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).posts_count,
+            author_count,
+        )
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, group_count)
+        self.assertEqual(self.other_group.posts_count, other_group_count)
+
+    def test_create_edit_delete_update_counters(self):
+        """Счётчики следуют за созданием, сменой группы и удалением."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Новый пост', 'group': self.group.id},
+        )
+        self.assertCounts(1, 1, 0)
+        post = Post.objects.get()
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': 'Новый текст', 'group': self.other_group.id},
+        )
+        self.assertCounts(1, 0, 1)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': 'Ещё текст', 'group': self.other_group.id},
+        )
+        self.assertCounts(1, 0, 1)
+        Post.objects.get().delete()
+        self.assertCounts(0, 0, 0)
+
+    def test_pages_show_stored_count(self):
+        """Профиль и пост показывают счётчик без COUNT(*)."""
+        post = Post.objects.create(author=self.user, text='Тестовый пост')
+        AuthorStats.objects.filter(author=self.user).update(posts_count=42)
+        addresses = (
+            reverse('posts:profile', kwargs={'username': 'Byblik'}),
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+        )
+        for address in addresses:
+            with self.subTest(address=address):
+                response = self.authorized_client.get(address)
+                self.assertContains(response, '42')
+
+    def test_reconcile_command_fixes_drift(self):
+        """Команда reconcile_post_counters исправляет расхождения."""
+        Post.objects.bulk_create([
+            Post(author=self.user, group=self.group, text='Пост 1'),
+            Post(author=self.user, group=self.group, text='Пост 2'),
+        ])
+        Group.objects.filter(pk=self.other_group.pk).update(posts_count=7)
+        call_command(
+            'reconcile_post_counters', batch_size=1, stdout=StringIO()
+        )
+        self.assertCounts(2, 2, 0)
+
+    def test_reconcile_command_refreshes_estimate(self):
+        """Команда обновляет статистику, из которой оценивается число
+        постов."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {number}')
+            for number in range(3)
+        )
+        call_command('reconcile_post_counters', stdout=StringIO())
+        self.assertEqual(estimate_table_rows(Post), 3)
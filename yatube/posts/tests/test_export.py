@@ -0,0 +1,73 @@
+import csv
+import json
+from io import StringIO
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Byblik')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for number in range(3):
+            Post.objects.create(
+                author=cls.user,
+                group=cls.group if number else None,
+                text=f'Тестовый пост {number}',
+            )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_content(self, name, file_format, **kwargs):
+        response = self.authorized_client.get(reverse(
+            f'posts:{name}', kwargs={**kwargs, 'file_format': file_format}
+        ))
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_profile_export_jsonl(self):
+        """Выгрузка профиля в JSONL содержит все посты автора."""
+        content = self.get_content(
+            'profile_export', 'jsonl', username='Byblik'
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [row['text'] for row in rows],
+            [f'Тестовый пост {number}' for number in range(3)],
+        )
+        self.assertEqual(rows[0]['group'], '')
+        self.assertEqual(rows[1]['group'], 'test_slug')
+
+    def test_group_export_csv(self):
+        """Выгрузка группы в CSV содержит только посты группы."""
+        content = self.get_content('group_export', 'csv', slug='test_slug')
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['author'], 'Byblik')
+
+    def test_export_unknown_format(self):
+        """Неизвестный формат выгрузки даёт 404."""
+        response = self.authorized_client.get(reverse(
+            'posts:group_export',
+            kwargs={'slug': 'test_slug', 'file_format': 'xml'},
+        ))
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_requires_login(self):
+        """Аноним перенаправляется на страницу входа."""
+        response = Client().get(reverse(
+            'posts:profile_export',
+            kwargs={'username': 'Byblik', 'file_format': 'csv'},
+        ))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,148 @@
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import capture_on_commit_callbacks
+from posts.models import AuthorStats, Follow, InboxEntry, Post, User
+
+
+class FollowTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='author')
+        self.stranger = User.objects.create_user(username='stranger')
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def follow(self, username='author'):
+        return self.reader_client.post(
+            reverse('posts:profile_follow', kwargs={'username': username})
+        )
+
+    def feed(self, **params):
+        response = self.reader_client.get(
+            reverse('posts:follow_index'), params
+        )
+        return response.context['page_obj']
+
+    def test_follow_and_unfollow(self):
+        """Подписка и отписка меняют Follow и счётчик подписчиков."""
+        self.follow()
+        self.follow()
+        self.assertEqual(Follow.objects.count(), 1)
+        stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual(stats.followers_count, 1)
+        self.reader_client.post(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertFalse(Follow.objects.exists())
+        stats.refresh_from_db()
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_cannot_follow_self(self):
+        """На себя подписаться нельзя."""
+        self.follow('reader')
+        self.assertFalse(Follow.objects.exists())
+
+    def test_new_post_fanned_out_to_followers(self):
+        """Новый пост попадает в ленту подписчиков и только к ним."""
+        self.follow()
+        self.author_client.post(
+            reverse('posts:post_create'), data={'text': 'Для подписчиков'}
+        )
+        Post.objects.create(author=self.stranger, text='Чужой пост')
+        post = Post.objects.get(text='Для подписчиков')
+        self.assertTrue(
+            InboxEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(list(self.feed()), [post])
+
+    @override_settings(TASKS_EAGER=False)
+    def test_fan_out_waits_for_commit(self):
+        """Раскладка по лентам идёт только после фиксации поста."""
+        self.follow()
+        with capture_on_commit_callbacks() as callbacks:
+            self.author_client.post(
+                reverse('posts:post_create'),
+                data={'text': 'Для подписчиков'},
+            )
+        self.assertFalse(InboxEntry.objects.exists())
+        # Пул потоков не видит незафиксированную транзакцию теста,
+        # поэтому задачи из очереди выполняются здесь же.
+        inline_queue = SimpleNamespace(
+            submit=lambda task, items: task(list(items))
+        )
+        with mock.patch('core.tasks.get_queue', return_value=inline_queue):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(
+            InboxEntry.objects.filter(user=self.reader).count(), 1
+        )
+
+    @override_settings(TASKS_EAGER=False)
+    def test_lost_fan_out_recovered_by_command(self):
+        """Команда раскладывает посты, чья задача не выполнилась, и
+        не дублирует уже разложенные."""
+        self.follow()
+        with capture_on_commit_callbacks():
+            Post.objects.create(author=self.author, text='Потерянный пост')
+        call_command('fan_out_recent_posts', stdout=StringIO())
+        call_command('fan_out_recent_posts', stdout=StringIO())
+        self.assertEqual(
+            InboxEntry.objects.filter(user=self.reader).count(), 1
+        )
+
+    def test_follow_backfills_and_unfollow_clears_feed(self):
+        """Подписка показывает прошлые посты, отписка их убирает."""
+        post = Post.objects.create(author=self.author, text='Старый пост')
+        self.follow()
+        self.assertEqual(list(self.feed()), [post])
+        self.reader_client.post(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(list(self.feed()), [])
+
+    @override_settings(FOLLOW_FANOUT_LIMIT=1)
+    def test_popular_author_fanned_out_on_read(self):
+        """Посты популярного автора подмешиваются в ленту при чтении."""
+        self.follow()
+        self.assertTrue(
+            AuthorStats.objects.get(author=self.author).fan_out_on_read
+        )
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Популярный пост {number}')
+            for number in range(8)
+        )
+        Post.objects.create(author=self.author, text='Свежий пост')
+        self.assertFalse(InboxEntry.objects.exists())
+        other = User.objects.create_user(username='other')
+        with self.settings(FOLLOW_FANOUT_LIMIT=10):
+            self.follow('other')
+            for number in range(5):
+                Post.objects.create(author=other, text=f'Обычный {number}')
+        self.assertEqual(InboxEntry.objects.count(), 5)
+        first_page = self.feed(after='')
+        self.assertEqual(len(first_page), 10)
+        second_page = self.feed(after=first_page.next_cursor)
+        self.assertEqual(len(second_page), 4)
+        self.assertFalse(second_page.has_next())
+        seen = {post.pk for post in first_page} | {
+            post.pk for post in second_page
+        }
+        self.assertEqual(seen, set(Post.objects.values_list('pk', flat=True)))
+        back = self.feed(before=second_page.previous_cursor)
+        self.assertEqual(list(back), list(first_page))
+
+    def test_guest_redirected_from_follow_feed(self):
+        """Гостя лента подписок отправляет на вход."""
+        response = Client().get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,112 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import AuthorStats, Group, Post, User
+from posts.search import search_posts
+
+
+class ImportPostsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='Byblik')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        out = StringIO()
+        call_command(
+            'import_posts', path, stdout=out, stderr=StringIO(), **options
+        )
+        return out.getvalue()
+
+    def test_import_jsonl(self):
+        """JSONL импортируется пачками с датами, группами и счётчиками."""
+        rows = [
+            {
+                'author': 'Byblik',
+                'group': 'test_slug',
+                'text': f'Импортированный пост {number}',
+                'pub_date': f'2020-01-{number + 1:02d}T12:00:00',
+            }
+            for number in range(7)
+        ]
+        rows.append({'author': 'nobody', 'text': 'Без автора'})
+        rows.append({'author': 'Byblik', 'group': 'nope', 'text': 'Текст'})
+        content = '\n'.join(json.dumps(row) for row in rows) + '\n{битый\n'
+        output = self.run_import(
+            self.write('posts.jsonl', content),
+            batch_size=2,
+            batches_per_transaction=2,
+        )
+        self.assertIn('Импортировано 7, пропущено 3', output)
+        self.assertEqual(Post.objects.count(), 7)
+        first = Post.objects.order_by('pub_date').first()
+        self.assertEqual(
+            first.pub_date,
+            timezone.make_aware(datetime(2020, 1, 1, 12), timezone.utc),
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).posts_count, 7
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 7)
+        self.assertEqual(
+            len(search_posts(Post.objects.all(), 'импортированный')), 7
+        )
+
+    def test_wrong_json_types_skipped(self):
+        """Поля не того типа пропускают строку, а не обрывают импорт."""
+        rows = [
+            {'author': ['Byblik'], 'text': 'Автор списком'},
+            {'author': 'Byblik', 'group': 1, 'text': 'Группа числом'},
+            {'author': 'Byblik', 'text': ['Текст списком']},
+            {'author': 'Byblik', 'text': 'Дата числом', 'pub_date': 123},
+            {'author': 'Byblik', 'text': 'Нормальный пост'},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows)
+        output = self.run_import(self.write('posts.jsonl', content))
+        self.assertIn('Импортировано 1, пропущено 4', output)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)),
+            ['Нормальный пост'],
+        )
+
+    def test_import_csv(self):
+        """CSV импортируется, пустая группа означает пост без группы."""
+        path = self.write(
+            'posts.csv',
+            'author,group,text\n'
+            'Byblik,test_slug,"Пост, с запятой"\n'
+            'Byblik,,Пост без группы\n',
+        )
+        self.run_import(path)
+        self.assertEqual(
+            Post.objects.get(text='Пост, с запятой', group=self.group)
+            .text_html,
+            'Пост, с запятой',
+        )
+        self.assertTrue(
+            Post.objects.filter(text='Пост без группы', group=None).exists()
+        )
+        self.assertIsNotNone(
+            Post.objects.get(text='Пост без группы').pub_date
+        )
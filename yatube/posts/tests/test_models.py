@@ -1,4 +1,8 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models.signals import post_save
 from django.test import TestCase
 
 from ..models import Group, Post
@@ -32,3 +36,77 @@ class PostModelTest(TestCase):
         posts = PostModelTest.group
         expected_object_name = posts.title
         self.assertEqual(expected_object_name, str(posts))
+
+
+class PostTextHtmlTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_text_html_rendered_on_save(self):
+        """HTML текста экранируется и обновляется при каждом сохранении."""
+        post = Post.objects.create(author=self.user, text='<b>раз</b>\nдва')
+        self.assertEqual(post.text_html, '&lt;b&gt;раз&lt;/b&gt;<br>два')
+        post.text = 'три'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, 'три')
+
+    def test_backfill_text_html(self):
+        """Команда заполняет HTML у постов без него, а до того текст
+        рендерится на лету."""
+        post = Post.objects.create(author=self.user, text='раз\nдва')
+        Post.objects.filter(pk=post.pk).update(text_html='')
+        post.refresh_from_db()
+        self.assertEqual(post.rendered_text, 'раз<br>два')
+        call_command('backfill_text_html', batch_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, 'раз<br>два')
+        self.assertEqual(post.version, 1)
+
+
+class PostVersionTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        self.post = Post.objects.create(author=self.user, text='Текст')
+
+    def test_content_change_bumps_version(self):
+        """Правка текста или группы увеличивает версию."""
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertEqual(self.post.version, 2)
+        self.assertIsNotNone(self.post.edited_at)
+        self.post.group = self.group
+        self.post.save(update_fields=['group'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 3)
+
+    def test_unchanged_save_keeps_version(self):
+        """Сохранение без изменений или служебных полей не трогает
+        версию."""
+        self.post.save()
+        self.post.text_html = ''
+        self.post.save(update_fields=['text_html'])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 1)
+        self.assertIsNone(self.post.edited_at)
+
+    def test_receivers_see_integer_version(self):
+        """Обработчики post_save видят номер версии, а не выражение."""
+        seen = []
+
+        def receiver(sender, instance, **kwargs):
+            seen.append(instance.version)
+
+        post_save.connect(receiver, sender=Post)
+        self.addCleanup(post_save.disconnect, receiver, sender=Post)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertEqual(seen, [1])
+        self.assertEqual(self.post.version, 2)
@@ -0,0 +1,130 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import query_budget
+from posts import urls
+from posts.inbox import follow
+from posts.models import Group, Post, User
+
+# Число постов больше страницы ленты: N+1 сразу вылезет за бюджет.
+TEST_POSTS = 25
+# Адреса, которые принимают только POST.
+POST_ONLY = {'profile_follow', 'profile_unfollow'}
+
+
+class QueryBudgetTests(TestCase):
+    """Каждый адрес posts/urls.py укладывается в бюджет запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for number in range(TEST_POSTS):
+            Post.objects.create(
+                author=User.objects.create_user(
+                    username=f'user{number}', first_name=f'Имя{number}'
+                ) if number % 2 else cls.author,
+                group=cls.group,
+                text=f'Тестовый пост {number}',
+            )
+        cls.post = Post.objects.filter(author=cls.author).first()
+        for user in User.objects.exclude(pk=cls.author.pk):
+            follow(cls.author, user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def get_budgets(self):
+        """Адрес и бюджет запросов для каждого имени из posts/urls.py.
+
+        Два запроса в каждом бюджете уходят на сессию и пользователя.
+        Главная при пустом кеше ещё смотрит оценку размера ленты.
+        """
+        return {
+            'index': (reverse('posts:index'), 5),
+            'group_index': (reverse('posts:group_index'), 3),
+            'group_lists': (
+                reverse('posts:group_lists', kwargs={'slug': 'test_slug'}),
+                5,
+            ),
+            'profile': (
+                reverse(
+                    'posts:profile', kwargs={'username': 'author'}
+                ),
+                6,
+            ),
+            'group_export': (
+                reverse(
+                    'posts:group_export',
+                    kwargs={'slug': 'test_slug', 'file_format': 'csv'},
+                ),
+                4,
+            ),
+            'profile_export': (
+                reverse(
+                    'posts:profile_export',
+                    kwargs={'username': 'author', 'file_format': 'jsonl'},
+                ),
+                4,
+            ),
+            'post_detail': (
+                reverse(
+                    'posts:post_detail', kwargs={'post_id': self.post.id}
+                ),
+                3,
+            ),
+            'post_edit': (
+                reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+                4,
+            ),
+            'post_create': (reverse('posts:post_create'), 3),
+            'search': (reverse('posts:search') + '?q=Тестовый', 4),
+            'follow_index': (reverse('posts:follow_index'), 4),
+            # API не трогает сессию: дата новейшего поста, объект, лента.
+            'api_index': (reverse('posts:api_index'), 2),
+            'api_group_lists': (
+                reverse('posts:api_group_lists', kwargs={'slug': 'test_slug'}),
+                3,
+            ),
+            'api_profile': (
+                reverse('posts:api_profile', kwargs={'username': 'author'}),
+                3,
+            ),
+            # Отписка раньше подписки: подписка мерится на полном пути.
+            'profile_unfollow': (
+                reverse(
+                    'posts:profile_unfollow', kwargs={'username': 'user1'}
+                ),
+                8,
+            ),
+            'profile_follow': (
+                reverse(
+                    'posts:profile_follow', kwargs={'username': 'user1'}
+                ),
+                11,
+            ),
+        }
+
+    def test_every_url_has_budget(self):
+        """Для каждого адреса приложения задан бюджет запросов."""
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(names, set(self.get_budgets()))
+
+    def test_urls_fit_query_budget(self):
+        """Страницы не делают запросов на каждый пост."""
+        for name, (address, budget) in self.get_budgets().items():
+            with self.subTest(name=name):
+                send = (
+                    self.authorized_client.post if name in POST_ONLY
+                    else self.authorized_client.get
+                )
+                with query_budget(budget):
+                    response = send(address)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
@@ -0,0 +1,137 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts.directory import fetch_groups
+from posts.inbox import follow_feed_page
+from posts.models import AuthorStats, Follow, Group, Post, User
+from posts.paginators import CursorPaginator, encode_cursor
+
+# Объём таблицы, на которой проверяются планы запросов лент.
+SEED_POSTS = 20000
+SEED_AUTHORS = 50
+SEED_GROUPS = 20
+BATCH_SIZE = 500
+
+
+class FeedQueryPlanTests(TestCase):
+    """Ленты читаются по индексу, без полного скана и сортировки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username=f'author{number}')
+            for number in range(SEED_AUTHORS)
+        )
+        Group.objects.bulk_create(
+            Group(title=f'Группа {number}', slug=f'group-{number}')
+            for number in range(SEED_GROUPS)
+        )
+        author_ids = list(User.objects.values_list('id', flat=True))
+        group_ids = list(Group.objects.values_list('id', flat=True))
+        Post.objects.bulk_create(
+            (
+                Post(
+                    text=f'Пост {number}',
+                    author_id=author_ids[number % len(author_ids)],
+                    group_id=(
+                        group_ids[number % len(group_ids)]
+                        if number % 3 else None
+                    ),
+                )
+                for number in range(SEED_POSTS)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.author_id = author_ids[0]
+        cls.group_id = group_ids[0]
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    def explain_sql(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    def test_feed_queries_use_indexes(self):
+        """Каждая лента идёт по своему индексу без TEMP B-TREE."""
+        feeds = {
+            'post_pub_date_idx': Post.objects.all(),
+            'post_group_pub_date_idx': Post.objects.filter(
+                group_id=self.group_id
+            ),
+            'post_author_pub_date_idx': Post.objects.filter(
+                author_id=self.author_id
+            ),
+        }
+        for index_name, queryset in feeds.items():
+            with self.subTest(index=index_name):
+                plan = self.explain(
+                    queryset.order_by('-pub_date', '-id')[:10]
+                )
+                self.assertIn(f'USING INDEX {index_name}', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_cursor_queries_use_indexes(self):
+        """Курсорные страницы лент тоже не сортируют в памяти."""
+        anchor = Post.objects.order_by('-pub_date', '-id')[SEED_POSTS // 2]
+        feeds = (
+            Post.objects.all(),
+            Post.objects.filter(group_id=self.group_id),
+            Post.objects.filter(author_id=self.author_id),
+        )
+        for queryset in feeds:
+            paginator = CursorPaginator(
+                queryset.order_by('-pub_date', '-id'), 10
+            )
+            with self.subTest(query=str(queryset.query)):
+                with CaptureQueriesContext(connection) as queries:
+                    paginator.get_cursor_page(after=encode_cursor(anchor))
+                for query in queries.captured_queries:
+                    plan = self.explain_sql(query['sql'])
+                    self.assertIn('USING INDEX', plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_pulled_authors_read_by_index(self):
+        """Посты авторов, собираемые при чтении ленты подписок, читаются
+        по индексу автора, а не сортируются все разом."""
+        reader = User.objects.create_user(username='reader')
+        pulled = list(User.objects.filter(
+            username__in=('author0', 'author1', 'author2')
+        ))
+        for author in pulled:
+            Follow.objects.create(user=reader, author=author)
+            AuthorStats.objects.update_or_create(
+                author=author, defaults={'fan_out_on_read': True}
+            )
+        with CaptureQueriesContext(connection) as queries:
+            page = follow_feed_page(reader, 10)
+        self.assertEqual(len(page), 10)
+        post_queries = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "posts_post"' in query['sql']
+        ]
+        self.assertEqual(len(post_queries), len(pulled))
+        for sql in post_queries:
+            plan = self.explain_sql(sql)
+            self.assertIn('USING INDEX post_author_pub_date_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_directory_reads_last_post_by_index(self):
+        """Дата последнего поста в каталоге групп берётся одной записью
+        индекса группы, без чтения всех постов и сортировки."""
+        with CaptureQueriesContext(connection) as queries:
+            groups, _ = fetch_groups()
+        self.assertEqual(len(groups), SEED_GROUPS)
+        self.assertIsNotNone(groups[0]['last_pub_date'])
+        (query,) = queries.captured_queries
+        plan = self.explain_sql(query['sql'])
+        self.assertIn('post_group_pub_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertNotIn('GROUP BY', query['sql'])
@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.search import FTS_TABLE, search_posts
+
+
+class PostSearchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='Byblik')
+        self.guest_client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@ya.ru', password='admin_pass'
+        )
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def search(self, term):
+        return list(search_posts(Post.objects.all(), term))
+
+    def test_search_ranks_results(self):
+        """Пост с частым совпадением выше поста с редким."""
+        rare = Post.objects.create(
+            author=self.user,
+            text='Кот спит, а за окном идёт долгий осенний дождь',
+        )
+        frequent = Post.objects.create(
+            author=self.user, text='Кот и кот, ещё раз кот'
+        )
+        Post.objects.create(author=self.user, text='Про собак')
+        self.assertEqual(self.search('кот'), [frequent, rare])
+
+    def test_index_follows_edit_delete_and_bulk_create(self):
+        """Индекс следует за правкой, удалением и bulk_create."""
+        post = Post.objects.create(author=self.user, text='Первый вариант')
+        post.text = 'Второй вариант'
+        post.save()
+        self.assertEqual(self.search('первый'), [])
+        self.assertEqual(self.search('второй'), [post])
+        post.delete()
+        self.assertEqual(self.search('второй'), [])
+        Post.objects.bulk_create([Post(author=self.user, text='Импорт')])
+        self.assertEqual(len(self.search('импорт')), 1)
+
+    def test_user_input_is_not_fts_syntax(self):
+        """Операторы FTS5 во вводе не ломают поиск."""
+        Post.objects.create(author=self.user, text='Текст с "кавычками"')
+        for term in ('"', 'AND (', 'NEAR(*', 'кавычками"'):
+            with self.subTest(term=term):
+                response = self.guest_client.get(
+                    reverse('posts:search'), {'q': term}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_search_page_paginates_with_query(self):
+        """Страница поиска листается с сохранением запроса."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост номер {number}')
+            for number in range(13)
+        )
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'номер', 'page': 2}
+        )
+        self.assertEqual(len(response.context['page_obj']), 3)
+        self.assertContains(response, 'q=%D0%BD%D0%BE%D0%BC%D0%B5%D1%80&amp;')
+
+    def test_rebuild_command_restores_index(self):
+        """rebuild_search_index восстанавливает испорченный индекс."""
+        post = Post.objects.create(author=self.user, text='Восстановление')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')"
+            )
+        self.assertEqual(self.search('восстановление'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('восстановление'), [post])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по полнотекстовому индексу."""
+        Post.objects.create(author=self.user, text='Найди меня')
+        Post.objects.create(author=self.user, text='Не меня')
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'найди'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertIn(FTS_TABLE, str(response.context['cl'].queryset.query))
@@ -1,10 +1,17 @@
 from django import forms
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from posts.cache import group_directory_key
+from posts.directory import GROUPS_PER_PAGE
 from posts.models import Group, Post, User
+from posts.paginators import encode_cursor
 
 TEST_POST = 13
 User = get_user_model()
@@ -12,6 +19,7 @@ User = get_user_model()
 
 class PaginatorViewsTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='auth')
         self.authorized_client = Client()
@@ -62,6 +70,88 @@ class PaginatorViewsTest(TestCase):
                 response = self.guest_client.get(page, {'page': 2})
                 self.assertEqual(len(response.context['page_obj']), 3)
 
+    def test_cursor_pages_walk_whole_feed(self):
+        """Курсорная навигация проходит ленту без пропусков и повторов."""
+        variables = {
+            reverse('posts:index'),
+            reverse(
+                'posts:profile', kwargs={'username': self.user.username}
+            ),
+            reverse(
+                'posts:group_lists', kwargs={'slug': self.group.slug}
+            )
+        }
+        for page in variables:
+            with self.subTest(page=page):
+                first = self.guest_client.get(page, {'after': ''})
+                first_page = first.context['page_obj']
+                self.assertEqual(len(first_page), 10)
+                self.assertFalse(first_page.has_previous())
+                second = self.guest_client.get(
+                    page, {'after': first_page.next_cursor}
+                )
+                second_page = second.context['page_obj']
+                self.assertEqual(len(second_page), 3)
+                self.assertFalse(second_page.has_next())
+                seen = [post.pk for post in first_page]
+                seen += [post.pk for post in second_page]
+                self.assertEqual(len(set(seen)), TEST_POST)
+                back = self.guest_client.get(
+                    page, {'before': second_page.previous_cursor}
+                )
+                self.assertEqual(
+                    list(back.context['page_obj']), list(first_page)
+                )
+
+    def test_cursor_page_does_not_count(self):
+        """Курсорная страница не выполняет COUNT(*)."""
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse('posts:index'), {'after': ''})
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_cursor_page_has_no_page_numbers(self):
+        """Курсорная страница не притворяется нумерованной."""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'after': ''}
+        )
+        page = response.context['page_obj']
+        self.assertNotIsInstance(page, Page)
+        self.assertFalse(hasattr(page, 'next_page_number'))
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+    def test_numbered_navigation_links_cursors(self):
+        """Ссылки «Следующая» и «Предыдущая» нумерованной страницы ведут
+        в курсорный режим, а не на следующий OFFSET."""
+        address = reverse('posts:index')
+        first_page = self.guest_client.get(address).context['page_obj']
+        self.assertEqual(
+            first_page.next_cursor, encode_cursor(first_page[-1])
+        )
+        response = self.guest_client.get(address)
+        self.assertContains(
+            response, f'href="?after={first_page.next_cursor}"'
+        )
+        response = self.guest_client.get(address, {'page': 2})
+        second_page = response.context['page_obj']
+        self.assertContains(
+            response, f'href="?before={second_page.previous_cursor}"'
+        )
+        back = self.guest_client.get(
+            address, {'before': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            list(back.context['page_obj']), list(first_page)
+        )
+
+    def test_broken_cursor_shows_first_page(self):
+        """Битый курсор отдаёт первую страницу ленты."""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'after': 'не-курсор'}
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+
 
 class TaskPagesTests(TestCase):
     @classmethod
@@ -77,6 +167,7 @@ class TaskPagesTests(TestCase):
             ))
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(TaskPagesTests.user)
@@ -85,6 +176,7 @@ class TaskPagesTests(TestCase):
         """URL-адрес использует соответствующий шаблон."""
         templates_pages_names = {
             reverse('posts:index'): 'posts/index.html',
+            reverse('posts:group_index'): 'posts/group_index.html',
             reverse(
                 'posts:group_lists', kwargs={
                     'slug': self.post.group.slug}
@@ -164,3 +256,134 @@ class TaskPagesTests(TestCase):
                 response = self.authorized_client.get(template)
                 name_of_field = response.context['page_obj']
                 self.assertIn(post, name_of_field, phrase)
+
+
+class PostDetailConditionalTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='Byblik')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.post = Post.objects.create(author=self.user, text='Текст')
+        self.address = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )
+
+    def test_edit_bumps_version(self):
+        """Правка поста увеличивает версию и ставит дату изменения."""
+        self.assertEqual(self.post.version, 1)
+        self.assertIsNone(self.post.edited_at)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            {'text': 'Новый текст'},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 2)
+        self.assertIsNotNone(self.post.edited_at)
+
+    def test_unchanged_post_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304 за один запрос
+        к базе сверх сессии."""
+        etag = self.authorized_client.get(self.address)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(
+                self.address, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 3)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        response = self.authorized_client.get(
+            self.address, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_username_change_changes_etag(self):
+        """Смена логина автора меняет ETag: на странице ссылка на его
+        профиль."""
+        etag = self.authorized_client.get(self.address)['ETag']
+        User.objects.filter(pk=self.user.pk).update(username='Renamed')
+        response = self.authorized_client.get(
+            self.address, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response, reverse('posts:profile', args=('Renamed',))
+        )
+
+
+class GroupIndexViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Vasya')
+        self.client = Client()
+        self.groups = [
+            Group.objects.create(
+                title=f'Группа {number}', slug=f'g{number:02}'
+            )
+            for number in range(GROUPS_PER_PAGE + 5)
+        ]
+        self.post = Post.objects.create(
+            author=self.user, text='Текст', group=self.groups[0]
+        )
+        self.address = reverse('posts:group_index')
+
+    def test_groups_show_count_and_last_post(self):
+        """Каталог показывает число постов и дату последнего поста."""
+        response = self.client.get(self.address)
+        first = response.context['page_obj'][0]
+        self.assertEqual(first['slug'], 'g00')
+        self.assertEqual(first['posts_count'], 1)
+        self.assertEqual(first['last_pub_date'], self.post.pub_date)
+        self.assertIsNone(response.context['page_obj'][1]['last_pub_date'])
+
+    def test_pages_by_slug(self):
+        """Страницы каталога идут по slug вперёд и назад."""
+        page = self.client.get(self.address).context['page_obj']
+        self.assertEqual(len(page), GROUPS_PER_PAGE)
+        self.assertEqual(page.next_cursor, f'g{GROUPS_PER_PAGE - 1:02}')
+        page = self.client.get(
+            self.address, {'after': page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [group['slug'] for group in page],
+            [group.slug for group in self.groups[GROUPS_PER_PAGE:]],
+        )
+        self.assertFalse(page.has_next())
+        page = self.client.get(
+            self.address, {'before': page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(page), GROUPS_PER_PAGE)
+        self.assertEqual(page[0]['slug'], 'g00')
+        self.assertFalse(page.has_previous())
+
+    def test_directory_is_cached_and_invalidated(self):
+        """Повторный запрос не ходит в базу, а перенос поста в другую
+        группу сбрасывает кеш."""
+        self.client.get(self.address)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.address)
+        self.assertEqual(len(queries), 0)
+        self.post.group = self.groups[1]
+        self.post.save()
+        page = self.client.get(self.address).context['page_obj']
+        self.assertEqual(page[0]['posts_count'], 0)
+        self.assertIsNone(page[0]['last_pub_date'])
+        self.assertEqual(page[1]['posts_count'], 1)
+
+    def test_directory_key_hashes_cursor(self):
+        """Курсор из запроса попадает в ключ кеша только хешем."""
+        cursor = 'x' * 300 + '\x01 '
+        key = group_directory_key(after=cursor)
+        self.assertNotIn(cursor, key)
+        self.assertLess(len(key), 250)
+        self.assertTrue(key.isprintable())
+        self.assertNotIn(' ', key)
+        self.assertNotEqual(key, group_directory_key(before=cursor))
+
+    def test_new_group_invalidates_directory(self):
+        """Новая группа сразу появляется в каталоге."""
+        self.client.get(self.address)
+        Group.objects.create(title='Первая', slug='a')
+        page = self.client.get(self.address).context['page_obj']
+        self.assertEqual(page[0]['slug'], 'a')
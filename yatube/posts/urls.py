@@ -1,17 +1,47 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
 urlpatterns = [
     # Главная страница
     path('', views.index, name='index'),
+    # Каталог групп
+    path('groups/', views.group_index, name='group_index'),
     path('group/<slug>/', views.group_posts, name='group_lists'),
+    path(
+        'group/<slug>/export/<file_format>/',
+        views.group_export,
+        name='group_export',
+    ),
     # Профайл пользователя
     path('profile/<username>/', views.profile, name='profile'),
+    path(
+        'profile/<username>/export/<file_format>/',
+        views.profile_export,
+        name='profile_export',
+    ),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('create/', views.post_create, name='post_create'),
+    # Лента подписок и подписка на авторов
+    path('follow/', views.follow_index, name='follow_index'),
+    path(
+        'profile/<username>/follow/',
+        views.profile_follow,
+        name='profile_follow',
+    ),
+    path(
+        'profile/<username>/unfollow/',
+        views.profile_unfollow,
+        name='profile_unfollow',
+    ),
+    # Поиск по текстам постов
+    path('search/', views.search, name='search'),
+    # JSON-версии лент
+    path('api/posts/', api.index, name='api_index'),
+    path('api/group/<slug>/', api.group_posts, name='api_group_lists'),
+    path('api/profile/<username>/', api.profile, name='api_profile'),
 ]
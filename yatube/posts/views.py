@@ -1,35 +1,64 @@
-from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.http import require_http_methods
+import hashlib
+from urllib.parse import urlencode
+
 from django.core.paginator import Paginator
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import (
+    condition, require_http_methods, require_POST
+)
 from django.contrib.auth.decorators import login_required
 
+from core.ratelimit import ratelimit
+from core.replicas import read_replica
+
+from .cache import (
+    AUTHOR_SCOPE, GLOBAL_SCOPE, GROUP_SCOPE, author_scope,
+    cache_anonymous_page, feed_count_key, group_scope
+)
+from . import directory, export, inbox
 from .forms import PostForm
-from .models import Post, Group, User
+from .models import Follow, Post, Group, User
+from .paginators import estimate_table_rows, paginate
+from .search import search_posts
 
 NUMBER_POSTS = 10
 
 
+@read_replica
+@cache_anonymous_page(GLOBAL_SCOPE)
 def index(request):
-    post_list = Post.objects.all().order_by('-pub_date')
-    paginator = Paginator(post_list, NUMBER_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.select_related('author', 'group').order_by(
+        '-pub_date', '-id'
+    )
+    page_obj = paginate(
+        request,
+        post_list,
+        NUMBER_POSTS,
+        count_cache_key=feed_count_key(GLOBAL_SCOPE),
+        estimate=lambda: estimate_table_rows(Post),
+    )
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_replica
+@cache_anonymous_page(GROUP_SCOPE, 'slug')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
 
-    posts_list = Post.objects.all().filter(group=group).order_by(
-        '-pub_date'
-    )
+    posts_list = Post.objects.select_related('author', 'group').filter(
+        group=group
+    ).order_by('-pub_date', '-id')
 
-    paginator = Paginator(posts_list, NUMBER_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(
+        request,
+        posts_list,
+        NUMBER_POSTS,
+        count_cache_key=feed_count_key(group_scope(slug)),
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -37,22 +66,117 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_replica
+@cache_anonymous_page(AUTHOR_SCOPE, 'username')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all().order_by('-pub_date')
-    paginator = Paginator(posts, NUMBER_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.select_related('author', 'group').order_by(
+        '-pub_date', '-id'
+    )
+    page_obj = paginate(
+        request,
+        posts,
+        NUMBER_POSTS,
+        count_cache_key=feed_count_key(author_scope(username)),
+    )
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author=author
+    ).exists()
     context = {
         'author': author,
         'page_obj': page_obj,
-
+        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@read_replica
+def group_index(request):
+    page_obj = directory.directory_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/group_index.html', context)
+
+
+@login_required
+def group_export(request, slug, file_format):
+    if file_format not in export.RENDERERS:
+        raise Http404
+    group = get_object_or_404(Group, slug=slug)
+    return export.export_response(
+        Post.objects.filter(group=group), file_format, f'group-{slug}'
+    )
+
+
+@login_required
+def profile_export(request, username, file_format):
+    if file_format not in export.RENDERERS:
+        raise Http404
+    author = get_object_or_404(User, username=username)
+    return export.export_response(
+        author.posts.all(), file_format, f'profile-{username}'
+    )
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(
+        Post.objects.select_related('author', 'group'), query
+    )
+    paginator = Paginator(posts, NUMBER_POSTS)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def get_detail_post(request, post_id):
+    """Пост для страницы поста, прочитанный один раз за запрос."""
+    if not hasattr(request, 'detail_post'):
+        request.detail_post = Post.objects.select_related(
+            'author__stats', 'group'
+        ).filter(id=post_id).first()
+    return request.detail_post
+
+
+def post_detail_etag(request, post_id):
+    """ETag страницы поста из того же запроса по первичному ключу,
+    которым страница читает пост.
+
+    Кроме версии поста учитывает всё, что страница берёт у автора и
+    группы, и пользователя, от которого зависит ссылка на правку.
+    """
+    post = get_detail_post(request, post_id)
+    if post is None:
+        return None
+    stats = getattr(post.author, 'stats', None)
+    raw = ':'.join(str(value) for value in (
+        post.pk,
+        post.version,
+        post.author.username,
+        post.author.get_full_name(),
+        stats and stats.posts_count,
+        post.group and post.group.slug,
+        request.user.pk,
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+@read_replica
+@condition(etag_func=post_detail_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_detail_post(request, post_id)
+    if post is None:
+        raise Http404
     context = {
         'post': post,
     }
@@ -60,6 +184,7 @@ def post_detail(request, post_id):
 
 
 @login_required
+@ratelimit('post_create')
 def post_create(request):
     form = PostForm(request.POST)
     if form.is_valid():
@@ -75,11 +200,13 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    if request.user != post.author:
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post_id)
     form = PostForm(request.POST or None, instance=post)
     if form.is_valid():
-        form.save()
+        # Сохранение без изменений не сдвигает версию поста.
+        if form.has_changed():
+            form.save()
         return redirect('posts:post_detail', post_id)
     context = {
         'post': post,
@@ -87,3 +214,34 @@ def post_edit(request, post_id):
         'is_edit': True,
     }
     return render(request, 'posts/post_create.html', context)
+
+
+@login_required
+def follow_index(request):
+    page_obj = inbox.follow_feed_page(
+        request.user,
+        NUMBER_POSTS,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/follow.html', context)
+
+
+@require_POST
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        inbox.follow(request.user, author)
+    return redirect('posts:profile', username)
+
+
+@require_POST
+@login_required
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    inbox.unfollow(request.user, author)
+    return redirect('posts:profile', username)
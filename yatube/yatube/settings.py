@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -39,6 +40,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -74,6 +76,127 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: ленты и страницы постов читают с них, запись
+# идёт в default. Для локальной проверки YATUBE_SQLITE_REPLICAS=N
+# подключает N копий db.sqlite3, которые обновляет команда
+# sync_sqlite_replicas.
+DATABASE_REPLICAS = []
+for number in range(1, int(os.environ.get('YATUBE_SQLITE_REPLICAS', 0)) + 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.replica{number}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Прагмы для каждого нового соединения с SQLite (см. core/sqlite.py).
+# WAL пускает чтение параллельно с записью, synchronous=normal в WAL
+# не теряет целостность при падении процесса, mmap_size и cache_size
+# в байтах и (отрицательное) в КиБ, busy_timeout в миллисекундах.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'memory',
+}
+
+# Сколько секунд после записи чтения пользователя идут в основную базу.
+REPLICA_STICKY_SECONDS = 10
+
+# Фоновые задачи после записи постов (core.tasks): число потоков,
+# повторы упавшей задачи и пауза перед первым повтором в секундах.
+# TASKS_EAGER выполняет задачи сразу в том же потоке; его включает
+# тестовый запуск, где транзакции тестов не фиксируются.
+TASKS_EAGER = False
+TASKS_WORKERS = 2
+TASKS_MAX_RETRIES = 3
+TASKS_RETRY_DELAY = 0.5
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Лимиты частоты записей по имени представления: «запросов/период»,
+# период — s, m, h или d. Считаются в скользящем окне для пользователя,
+# у анонимного посетителя — для IP-адреса. Имя без лимита не
+# ограничивается. Счётчики лежат в CACHES['default'].
+RATELIMITS = {
+    'post_create': '10/m',
+    'signup': '5/h',
+}
+# Сколько прокси перед приложением дописывают адрес клиента в
+# X-Forwarded-For. 0 — приложение видно напрямую, адрес берётся из
+# REMOTE_ADDR; иначе за прокси все анонимы попадут в один счётчик.
+RATELIMIT_TRUSTED_PROXIES = 0
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# LocMemCache годится только для разработки с одним процессом. Версии
+# кеша лент и счётчики лимитов частоты должны быть видны всем рабочим
+# процессам, поэтому в бою нужен общий кеш (memcached, Redis).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Сколько секунд анонимный посетитель может видеть устаревшую ленту.
+# 0 выключает кеш страниц лент. Правки сбрасывают кеш, поднимая версии
+# лент после фиксации транзакции; без общего кеша (см. CACHES) другие
+# процессы этого не увидят и отдают старые страницы весь этот срок.
+POSTS_PAGE_CACHE_TIMEOUT = 60
+
+# Сколько секунд хранить число постов для постраничной навигации.
+POSTS_COUNT_CACHE_TIMEOUT = 30
+
+# Сколько секунд хранить страницу каталога групп. Каталог сбрасывается
+# при изменении групп и их числа постов, так что срок лишь страхует от
+# пропущенного сброса; 0 выключает кеш.
+GROUP_DIRECTORY_CACHE_TIMEOUT = 3600
+
+# С какого размера ленты вместо COUNT(*) брать оценку из статистики
+# ANALYZE (sqlite_stat1). Статистику обновляет команда
+# reconcile_post_counters, её стоит запускать по расписанию.
+POSTS_ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Сколько постов переносить или удалять одним запросом в массовых
+# действиях админки; каждая пачка — отдельная транзакция.
+POSTS_MODERATION_CHUNK_SIZE = 500
+
+# С какого числа подписчиков посты автора не раскладываются по лентам
+# подписчиков при публикации, а подмешиваются при чтении.
+FOLLOW_FANOUT_LIMIT = 10000
+# Сколько записей ленты подписок вставлять за один запрос.
+FOLLOW_FANOUT_BATCH_SIZE = 500
+# Сколько последних постов автора сразу получает новый подписчик.
+FOLLOW_BACKFILL_POSTS = 100
+
+
+# Какую долю запросов профилировать (от 0 до 1): время SQL, шаблонов
+# и представления уходит в заголовок Server-Timing и в лог
+# core.profiling. 0 выключает профилирование.
+PROFILING_SAMPLE_RATE = 0
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
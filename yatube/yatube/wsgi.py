@@ -11,6 +11,12 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from core.warmup import warm_templates
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Шаблоны компилируются при запуске процесса, а не на первых запросах.
+# При DEBUG кеширующего загрузчика нет, и прогрев ничего не делает.
+warm_templates()